@@ -6,6 +6,7 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gdk, GdkPixbuf, Gio, Gtk, Pango
+from ks_includes.icon_atlas import IconAtlas
 
 
 def find_widget(widget, wanted_type):
@@ -32,7 +33,10 @@ class KlippyGtk:
 
     def __init__(self, screen):
         self.screen = screen
+        self.theme = screen.theme
         self.themedir = os.path.join(pathlib.Path(__file__).parent.resolve().parent, "styles", screen.theme, "images")
+        # (theme, name, width, height): pixbuf, None if the icon doesn't exist
+        self.icon_cache = {}
         self.cursor = screen.show_cursor
         self.font_size_type = screen._config.get_main_config().get("font_size", "medium")
         self.width = screen.width
@@ -77,6 +81,10 @@ class KlippyGtk:
         if (self.height / self.width) >= 3:  # Ultra-tall
             self.keyboard_height = self.keyboard_height * 0.5
 
+        self.label_updates = {"applied": 0, "skipped": 0}
+        self.icon_atlas = None
+        self.init_icon_atlas()
+
         self.color_list = {}  # This is set by screen.py init_style()
         for key in self.color_list:
             if "base" in self.color_list[key]:
@@ -116,21 +124,52 @@ class KlippyGtk:
             la.get_style_context().add_class(style)
         return la
 
+    def set_label(self, widget, text):
+        # Setting the same text again still triggers a Pango relayout, skip it
+        if widget.get_label() == text:
+            self._count_label_update("skipped")
+            return
+        widget.set_label(text)
+        self._count_label_update("applied")
+
+    def _count_label_update(self, result):
+        self.label_updates[result] += 1
+        if (self.label_updates["applied"] + self.label_updates["skipped"]) % 5000 == 0:
+            logging.debug(f"Label updates: {self.label_updates['applied']} applied, "
+                          f"{self.label_updates['skipped']} skipped")
+
     def Image(self, image_name=None, width=None, height=None):
         if image_name is None:
             return Gtk.Image()
         pixbuf = self.PixbufFromIcon(image_name, width, height)
         return Gtk.Image.new_from_pixbuf(pixbuf) if pixbuf is not None else Gtk.Image()
 
+    def init_icon_atlas(self):
+        signature = f"{self.theme}_{self.width}x{self.height}_{self.font_size_type}_{self.font_size:.2f}"
+        self.icon_atlas = IconAtlas(self.screen._config.get_cache_dir(), signature)
+
     def PixbufFromIcon(self, filename, width=None, height=None):
         width = width if width is not None else self.img_width
         height = height if height is not None else self.img_height
-        filename = os.path.join(self.themedir, filename)
+        key = (self.theme, filename, int(width), int(height))
+        if key in self.icon_cache:
+            return self.icon_cache[key]
+        pixbuf = self.icon_atlas.get(filename, int(width), int(height))
+        if pixbuf is not None:
+            self.icon_cache[key] = pixbuf
+            return pixbuf
+        path = os.path.join(self.themedir, filename)
         for ext in ["svg", "png"]:
-            pixbuf = self.PixbufFromFile(f"{filename}.{ext}", int(width), int(height))
-            if pixbuf is not None:
-                return pixbuf
-        return None
+            if os.path.exists(f"{path}.{ext}"):
+                pixbuf = self.PixbufFromFile(f"{path}.{ext}", int(width), int(height))
+                if pixbuf is not None:
+                    if ext == "svg":
+                        self.icon_atlas.add(filename, int(width), int(height), f"{path}.{ext}", pixbuf)
+                    break
+        if pixbuf is None:
+            logging.error(f"Unable to find icon {path}")
+        self.icon_cache[key] = pixbuf
+        return pixbuf
 
     @staticmethod
     def PixbufFromFile(filename, width=-1, height=-1):
@@ -1,14 +1,46 @@
 import logging
 import re
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 class KlippyRest:
-    def __init__(self, ip, port=7125, api_key=False):
+    def __init__(self, ip, port=7125, api_key=False, pool_size=4, retries=2):
         self.ip = ip
         self.port = port
         self.api_key = api_key
-        self.status = ''
+        # The last error, per thread so the thumbnail workers don't replace the one shown while connecting
+        self.local = threading.local()
+        self.session = self.create_session(pool_size, retries)
+        # Connection attempts run on the main loop, they fail right away instead of retrying
+        self.probe_session = self.create_session(1, 0)
+        # endpoint: {count, errors, total, max} in ms
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    def create_session(self, pool_size, retries):
+        # Keep-alive connections shared by the main loop and the thumbnail workers
+        session = requests.Session()
+        # Only idempotent requests are retried, and only when the connection fails
+        retry = Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=.2, allowed_methods={"GET"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if self.api_key:
+            session.headers["x-api-key"] = self.api_key
+        return session
+
+    @property
+    def status(self):
+        return getattr(self.local, "status", '')
+
+    @status.setter
+    def status(self, status):
+        self.local.status = status
 
     @property
     def endpoint(self):
@@ -17,11 +49,11 @@ class KlippyRest:
             protocol = "https"
         return f"{protocol}://{self.ip}:{self.port}"
 
-    def get_server_info(self):
-        return self.send_request("server/info")
+    def get_server_info(self, retry=True):
+        return self.send_request("server/info", retry=retry)
 
-    def get_oneshot_token(self):
-        r = self.send_request("access/oneshot_token")
+    def get_oneshot_token(self, retry=True):
+        r = self.send_request("access/oneshot_token", retry=retry)
         if r is False or 'result' not in r:
             return False
         return r['result']
@@ -35,19 +67,14 @@ class KlippyRest:
     def get_thumbnail_stream(self, thumbnail):
         return self.send_request(f"server/files/gcodes/{thumbnail}", json=False)
 
-    def _do_request(self, method, request_method, data=None, json=None, json_response=True, timeout=3):
+    def _do_request(self, method, request_method, data=None, json=None, json_response=True, timeout=3, retry=True):
         url = f"{self.endpoint}/{method}"
-        headers = {} if self.api_key is False else {"x-api-key": self.api_key}
         response_data = False
+        start = time.monotonic()
         try:
-            callee = getattr(requests, request_method)
-            response = callee(url, json=json, data=data, headers=headers, timeout=timeout)
-            response.raise_for_status()
             if json_response:
                 logging.debug(f"Sending request to {url}")
-                response_data = response.json()
-            else:
-                response_data = response.content
+            response_data = self.fetch(url, request_method, data, json, json_response, timeout, retry)
         except requests.exceptions.HTTPError as h:
             self.status = self.format_status(h)
         except requests.exceptions.ConnectionError as c:
@@ -60,17 +87,55 @@ class KlippyRest:
             self.status = self.format_status(r)
         except Exception as e:
             self.status = self.format_status(e)
+        self.record(method, time.monotonic() - start, not response_data)
         if response_data:
             self.status = ''
         else:
             logging.error(self.status.replace('\n', '>>'))
         return response_data
 
+    def fetch(self, url, request_method, data, json, json_response, timeout, retry=True):
+        session = self.session if retry else self.probe_session
+        response = session.request(request_method, url, json=json, data=data, timeout=timeout)
+        response.raise_for_status()
+        return response.json() if json_response else response.content
+
+    @staticmethod
+    def stats_key(method):
+        """Groups requests by endpoint, without the query and the file path"""
+        path = method.split("?")[0]
+        if path.startswith("server/files/"):
+            return "/".join(path.split("/")[:3])
+        return path
+
+    def record(self, method, elapsed, error=False):
+        key = self.stats_key(method)
+        elapsed *= 1000
+        with self.stats_lock:
+            stat = self.stats.setdefault(key, {"count": 0, "errors": 0, "total": 0, "max": 0})
+            stat["count"] += 1
+            stat["errors"] += int(error)
+            stat["total"] += elapsed
+            stat["max"] = max(stat["max"], elapsed)
+
+    def request_stats(self):
+        with self.stats_lock:
+            return {key: dict(stat, avg=stat["total"] / stat["count"]) for key, stat in self.stats.items()}
+
+    def log_stats(self):
+        for key, stat in sorted(self.request_stats().items()):
+            logging.debug(f"{key}: {stat['count']} requests, {stat['errors']} failed, "
+                          f"avg {stat['avg']:.1f} ms, max {stat['max']:.1f} ms")
+
+    def close(self):
+        self.session.close()
+        self.probe_session.close()
+
     def post_request(self, method, data=None, json=None, json_response=True):
         return self._do_request(method, "post", data, json, json_response)
 
-    def send_request(self, method, json=True, timeout=3):
-        return self._do_request(method, "get", json_response=json, timeout=timeout)
+    def send_request(self, method, json=True, timeout=3, retry=True):
+        return self._do_request(method, "get", json_response=json, timeout=timeout, retry=retry)
 
     @staticmethod
     def format_status(status):
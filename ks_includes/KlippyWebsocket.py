@@ -1,8 +1,9 @@
 #!/usr/bin/python
 
 import threading
-import json
 import logging
+import time
+from collections import deque
 
 import gi
 import websocket
@@ -10,15 +11,67 @@ import websocket
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib
 from ks_includes.KlippyGcodes import KlippyGcodes
+from ks_includes.json_codec import JsonCodec
+
+
+class MoonrakerRequest:
+    """Handle of a JSON-RPC request sent to Moonraker, resolved by the response, a timeout or a disconnect."""
+
+    def __init__(self, req_id, method, params, callback=None, args=(), timeout=None):
+        self.id = req_id
+        self.method = method
+        self.params = params
+        self.callback = callback
+        self.args = args
+        self.timeout = timeout
+        self.deadline = None
+        self.batched = False
+        self.sent = False
+        self.response = None
+
+    @property
+    def done(self):
+        return self.response is not None
+
+    @property
+    def result(self):
+        return self.response.get('result') if self.response else None
+
+    @property
+    def error(self):
+        return self.response.get('error') if self.response else None
+
+    def mark_sent(self):
+        self.sent = True
+        if self.timeout:
+            self.deadline = time.monotonic() + self.timeout
+
+    def resolve(self, response):
+        self.response = response
 
 
 class KlippyWebsocket(threading.Thread):
     _req_id = 0
     connected = False
     connecting = True
-    callback_table = {}
     reconnect_count = 0
     max_retries = 4
+    # Status changes dispatched right away instead of waiting for the coalescing window
+    # None means any field of the object
+    priority_updates = {
+        "webhooks": None,
+        "print_stats": ("state",),
+        "idle_timeout": ("state",),
+        "pause_resume": None,
+        "manual_probe": None,
+    }
+    # Seconds before a request without response is failed, methods below can legitimately take longer
+    request_timeout = 30
+    untimed_methods = ("printer.gcode.script", "printer.print.", "machine.update.")
+    # Queued requests are sent as JSON-RPC batch arrays of up to batch_size,
+    # if the server rejects batches they are pipelined with at most max_in_flight outstanding
+    batch_size = 50
+    max_in_flight = 16
 
     def __init__(self, screen, callback, host, port):
         threading.Thread.__init__(self)
@@ -31,6 +84,24 @@ class KlippyWebsocket(threading.Thread):
         self.closing = False
         self.host = host
         self.port = port
+        self.codec = JsonCodec()
+        self.status_window = screen._config.get_main_config().getint("status_update_window", 150)
+        self.status_lock = threading.Lock()
+        self.status_pending = {}
+        self.status_timer = None
+        self.status_received = 0
+        self.status_delivered = 0
+        self.requests = {}
+        self.requests_lock = threading.Lock()
+        self.requests_timer = None
+        self.batch_queue = deque()
+        self.batch_timer = None
+        self.batch_supported = None
+        self.batches_sent = 0
+        self.peak_in_flight = 0
+        # Requests sent and waiting for a response, kept up to date instead of scanning self.requests
+        self.in_flight = 0
+        self.batched_in_flight = 0
 
     @property
     def _url(self):
@@ -68,7 +139,8 @@ class KlippyWebsocket(threading.Thread):
         logging.debug("Attempting to connect")
         self.reconnect_count += 1
         try:
-            state = self._screen.apiclient.get_server_info()
+            # On the main loop, a host that doesn't answer must not block it through the retries
+            state = self._screen.apiclient.get_server_info(retry=False)
             if state is False:
                 if self.reconnect_count > 2:
                     self._screen.printer_initializing(
@@ -76,13 +148,16 @@ class KlippyWebsocket(threading.Thread):
                         + _("Retrying") + f' #{self.reconnect_count}'
                     )
                 return True
-            token = self._screen.apiclient.get_oneshot_token()
+            token = self._screen.apiclient.get_oneshot_token(retry=False)
         except Exception as e:
             logging.critical(e, exc_info=True)
             logging.debug("Unable to get oneshot token")
             return True
 
         self.ws_url = f"{self.ws_proto}://{self._url}/websocket?token={token}"
+        return self.start_websocket()
+
+    def start_websocket(self):
         self.ws = websocket.WebSocketApp(
             self.ws_url,
             on_close=self.on_close, on_error=self.on_error, on_message=self.on_message, on_open=self.on_open
@@ -103,16 +178,31 @@ class KlippyWebsocket(threading.Thread):
         if self.ws is not None:
             self.ws.close()
 
+    def stop_websocket(self):
+        self.ws.keep_running = False
+        self.close()
+
+    def transmit(self, payload, requests):
+        self.ws.send(payload)
+
     def on_message(self, *args):
         message = args[1] if len(args) == 2 else args[0]
-        response = json.loads(message)
-        if "id" in response and response['id'] in self.callback_table:
-            args = (response,
-                    self.callback_table[response['id']][1],
-                    self.callback_table[response['id']][2],
-                    *self.callback_table[response['id']][3])
-            GLib.idle_add(self.callback_table[response['id']][0], *args)
-            self.callback_table.pop(response['id'])
+        response = self.codec.loads(message)
+        if isinstance(response, dict) and response.get('method') == "notify_status_update" and self.status_window > 0:
+            self.queue_status_update(response['params'][0] if "params" in response else {})
+            return
+        # Keep the order, pending status updates go before any other message
+        self.flush_status_updates()
+        if isinstance(response, list):
+            self.batch_supported = True
+            for item in response:
+                self.resolve_request(item.get('id'), item)
+            return
+        if "id" in response:
+            if response['id'] is None and "error" in response:
+                self.batch_rejected(response['error'])
+                return
+            self.resolve_request(response['id'], response)
             return
 
         if "method" in response and "on_message" in self._callback:
@@ -120,31 +210,223 @@ class KlippyWebsocket(threading.Thread):
             GLib.idle_add(self._callback['on_message'], *args)
         return
 
-    def send_method(self, method, params=None, callback=None, *args):
+    def queue_status_update(self, data):
+        urgent = self.is_priority_update(data)
+        with self.status_lock:
+            self.status_received += 1
+            for obj in data:
+                self.status_pending.setdefault(obj, {}).update(data[obj])
+            if not urgent and self.status_timer is None:
+                self.status_timer = GLib.timeout_add(self.status_window, self._status_timeout)
+        if urgent:
+            self.flush_status_updates()
+
+    def is_priority_update(self, data):
+        for obj in data:
+            if obj not in self.priority_updates:
+                continue
+            fields = self.priority_updates[obj]
+            if fields is None or any(field in data[obj] for field in fields):
+                return True
+        return False
+
+    def _status_timeout(self):
+        with self.status_lock:
+            self.status_timer = None
+        self.flush_status_updates()
+        return False
+
+    def flush_status_updates(self):
+        with self.status_lock:
+            if not self.status_pending:
+                return False
+            data = self.status_pending
+            self.status_pending = {}
+            self.status_delivered += 1
+            received, delivered = self.status_received, self.status_delivered
+        if "on_message" in self._callback:
+            GLib.idle_add(self._callback['on_message'], "notify_status_update", data)
+        if delivered % 1000 == 0:
+            logging.debug(f"Status updates: {received} received, {delivered} delivered, "
+                          f"{received - delivered} merged")
+        return False
+
+    def send_method(self, method, params=None, callback=None, *args, timeout=None, batch=False):
+        """Returns a MoonrakerRequest or False if not connected.
+
+        timeout: seconds to wait for the response, None uses the default for the method, 0 waits forever.
+        On timeout or disconnect the callback gets a JSON-RPC error response.
+        batch: queue the request, bursts are sent together on the next main loop iteration.
+        """
         if not self.connected:
             return False
         if params is None:
             params = {}
+        if timeout is None:
+            timeout = 0 if method.startswith(self.untimed_methods) else self.request_timeout
+
+        with self.requests_lock:
+            self._req_id += 1
+            request = MoonrakerRequest(self._req_id, method, params, callback, args, timeout)
+            self.requests[request.id] = request
+            if timeout and self.requests_timer is None:
+                self.requests_timer = GLib.timeout_add_seconds(1, self._expire_requests)
+            if batch:
+                request.batched = True
+                self.batch_queue.append(request)
+                self._schedule_flush()
+                return request
+
+        self._send([request])
+        return request
 
-        self._req_id += 1
-        if callback is not None:
-            self.callback_table[self._req_id] = [callback, method, params, [*args]]
-
-        data = {
+    @staticmethod
+    def request_data(request):
+        return {
             "jsonrpc": "2.0",
-            "method": method,
-            "params": params,
-            "id": self._req_id
+            "method": request.method,
+            "params": request.params,
+            "id": request.id
         }
-        self.ws.send(json.dumps(data))
+
+    def _send(self, requests):
+        if len(requests) == 1:
+            data = self.request_data(requests[0])
+        else:
+            data = [self.request_data(request) for request in requests]
+            self.batches_sent += 1
+        with self.requests_lock:
+            for request in requests:
+                # It can already be failed by a disconnect
+                if request.id in self.requests:
+                    request.mark_sent()
+                    self.count_in_flight(request, 1)
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            in_flight = self.in_flight
+        try:
+            self.transmit(self.codec.dumps(data), requests)
+        except (websocket.WebSocketException, ConnectionError) as e:
+            logging.debug(f"Couldn't send {len(requests)} requests: {e}")
+            for request in requests:
+                self.resolve_request(request.id, self.error_response(request.id, 503, "Not connected to Moonraker"))
+        if len(requests) > 1:
+            logging.debug(f"Sent batch of {len(requests)} requests, {in_flight} in flight")
+
+    def _schedule_flush(self):
+        # Called with requests_lock held
+        if self.batch_queue and self.batch_timer is None:
+            self.batch_timer = GLib.idle_add(self.flush_batch)
+
+    def flush_batch(self):
+        with self.requests_lock:
+            if self.batch_supported is False:
+                count = max(self.max_in_flight - self.batched_in_flight, 0)
+            else:
+                count = self.batch_size
+            requests = [self.batch_queue.popleft() for _ in range(min(count, len(self.batch_queue)))]
+            requests = [req for req in requests if req.id in self.requests]
+            self.batch_timer = None
+            if self.batch_supported is not False or count > len(requests):
+                self._schedule_flush()
+        if not requests:
+            return False
+        if self.batch_supported is False:
+            for request in requests:
+                self._send([request])
+        else:
+            self._send(requests)
+        return False
+
+    def batch_rejected(self, error):
+        """Moonraker answers a batch it doesn't understand with a single error without id"""
+        with self.requests_lock:
+            resend = [req for req in self.requests.values() if req.batched and req.sent]
+            if self.batch_supported is not None or not resend:
+                logging.info(f"Moonraker error: {error}")
+                return
+            logging.info(f"Batch request rejected ({error.get('message')}), pipelining requests instead")
+            self.batch_supported = False
+            for request in resend:
+                request.sent = False
+                request.deadline = None
+                self.count_in_flight(request, -1)
+            self.batch_queue.extendleft(reversed(resend))
+            self._schedule_flush()
+
+    @property
+    def pending_requests(self):
+        return len(self.requests)
+
+    def count_in_flight(self, request, delta):
+        # Called with requests_lock held
+        self.in_flight += delta
+        if request.batched:
+            self.batched_in_flight += delta
+
+    def request_stats(self):
+        with self.requests_lock:
+            return {
+                "in_flight": self.in_flight,
+                "queued": len(self.batch_queue),
+                "peak_in_flight": self.peak_in_flight,
+                "batches_sent": self.batches_sent,
+                "batch_supported": self.batch_supported,
+            }
+
+    def log_stats(self):
+        stats = self.request_stats()
+        logging.debug(f"Websocket requests: {stats['in_flight']} in flight (peak {stats['peak_in_flight']}), "
+                      f"{stats['queued']} queued, {stats['batches_sent']} batches sent, "
+                      f"batches supported: {stats['batch_supported']}")
+
+    @staticmethod
+    def error_response(req_id, code, message):
+        return {"jsonrpc": "2.0", "error": {"code": code, "message": message}, "id": req_id}
+
+    def resolve_request(self, req_id, response):
+        with self.requests_lock:
+            request = self.requests.pop(req_id, None)
+            if request is not None and request.sent:
+                self.count_in_flight(request, -1)
+        if request is None:
+            return False
+        request.resolve(response)
+        if request.callback is not None:
+            GLib.idle_add(request.callback, response, request.method, request.params, *request.args)
+        if request.batched and self.batch_supported is False:
+            with self.requests_lock:
+                self._schedule_flush()
         return True
 
+    def _expire_requests(self):
+        now = time.monotonic()
+        with self.requests_lock:
+            expired = [req for req in self.requests.values() if req.deadline is not None and req.deadline <= now]
+        for request in expired:
+            logging.info(f"{request.method} timed out after {request.timeout}s")
+            self.resolve_request(request.id, self.error_response(request.id, 408, "Request timed out"))
+        with self.requests_lock:
+            if any(req.deadline is not None for req in self.requests.values()):
+                return True
+            self.requests_timer = None
+            return False
+
+    def fail_pending_requests(self, message):
+        with self.requests_lock:
+            pending = list(self.requests)
+            self.batch_queue.clear()
+        if pending:
+            logging.info(f"Failing {len(pending)} pending requests: {message}")
+        for req_id in pending:
+            self.resolve_request(req_id, self.error_response(req_id, 503, message))
+
     def on_open(self, *args):
         logging.info("Moonraker Websocket Open")
         self.connected = True
         self.connecting = False
         self._screen.reinit_count = 0
         self.reconnect_count = 0
+        self.batch_supported = None
         if "on_connect" in self._callback:
             GLib.idle_add(self._callback['on_connect'])
 
@@ -154,13 +436,15 @@ class KlippyWebsocket(threading.Thread):
         message = args[2] if len(args) == 3 else args[1]
         if message is not None:
             logging.info(f"{message}")
+        self.flush_status_updates()
+        self.log_stats()
+        self.fail_pending_requests("Lost Connection to Moonraker")
         if not self.connected:
             logging.debug("Connection already closed")
             return
         if self.closing:
             logging.debug("Closing websocket")
-            self.ws.keep_running = False
-            self.close()
+            self.stop_websocket()
             self.closing = False
             return
         if "on_close" in self._callback:
@@ -184,48 +468,55 @@ class MoonrakerApi:
             "printer.emergency_stop"
         )
 
-    def gcode_script(self, script, callback=None, *args):
+    def gcode_script(self, script, callback=None, *args, timeout=None):
         logging.debug(f"Sending printer.gcode.script: {script}")
         return self._ws.send_method(
             "printer.gcode.script",
             {"script": script},
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def get_file_dir(self, path='gcodes', callback=None, *args):
+    def get_file_dir(self, path='gcodes', callback=None, *args, timeout=None):
         logging.debug(f"Sending server.files.directory {path}")
         return self._ws.send_method(
             "server.files.list",
             {"path": path},
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def get_file_list(self, callback=None, *args):
+    def get_file_list(self, callback=None, *args, timeout=None):
         logging.debug("Sending server.files.list")
         return self._ws.send_method(
             "server.files.list",
             {},
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def get_dir_info(self, callback=None, directory='gcodes', *args):
+    def get_dir_info(self, callback=None, directory='gcodes', *args, timeout=None, batch=False):
         logging.debug(f"Sending server.files.get_directory  {directory}")
         return self._ws.send_method(
             "server.files.get_directory",
             {"path": directory},
             callback,
-            *args
+            *args,
+            timeout=timeout,
+            batch=batch
         )
 
-    def get_file_metadata(self, filename, callback=None, *args):
+    def get_file_metadata(self, filename, callback=None, *args, timeout=None, batch=False):
         return self._ws.send_method(
             "server.files.metadata",
             {"filename": filename},
             callback,
-            *args
+            *args,
+            timeout=timeout,
+            batch=batch
         )
 
     def object_subscription(self, updates):
@@ -235,52 +526,57 @@ class MoonrakerApi:
             updates
         )
 
-    def power_device_off(self, device, callback=None, *args):
+    def power_device_off(self, device, callback=None, *args, timeout=None):
         logging.debug(f"Sending machine.device_power.off: {device}")
         return self._ws.send_method(
             "machine.device_power.off",
             {device: False},
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def power_device_on(self, device, callback=None, *args):
+    def power_device_on(self, device, callback=None, *args, timeout=None):
         logging.debug("Sending machine.device_power.on {device}")
         return self._ws.send_method(
             "machine.device_power.on",
             {device: False},
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def print_cancel(self, callback=None, *args):
+    def print_cancel(self, callback=None, *args, timeout=None):
         logging.debug("Sending printer.print.cancel")
         return self._ws.send_method(
             "printer.print.cancel",
             {},
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def print_pause(self, callback=None, *args):
+    def print_pause(self, callback=None, *args, timeout=None):
         logging.debug("Sending printer.print.pause")
         return self._ws.send_method(
             "printer.print.pause",
             {},
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def print_resume(self, callback=None, *args):
+    def print_resume(self, callback=None, *args, timeout=None):
         logging.debug("Sending printer.print.resume")
         return self._ws.send_method(
             "printer.print.resume",
             {},
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def print_start(self, filename, callback=None, *args):
+    def print_start(self, filename, callback=None, *args, timeout=None):
         logging.debug("Sending printer.print.start")
         return self._ws.send_method(
             "printer.print.start",
@@ -288,10 +584,11 @@ class MoonrakerApi:
                 "filename": filename
             },
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def set_bed_temp(self, target, callback=None, *args):
+    def set_bed_temp(self, target, callback=None, *args, timeout=None):
         logging.debug(f"Sending set_bed_temp: {KlippyGcodes.set_bed_temp(target)}")
         return self._ws.send_method(
             "printer.gcode.script",
@@ -299,10 +596,11 @@ class MoonrakerApi:
                 "script": KlippyGcodes.set_bed_temp(target)
             },
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def set_heater_temp(self, heater, target, callback=None, *args):
+    def set_heater_temp(self, heater, target, callback=None, *args, timeout=None):
         logging.debug(f"Sending heater {heater} to temp: {target}")
         return self._ws.send_method(
             "printer.gcode.script",
@@ -310,10 +608,11 @@ class MoonrakerApi:
                 "script": KlippyGcodes.set_heater_temp(heater, target)
             },
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def set_temp_fan_temp(self, temp_fan, target, callback=None, *args):
+    def set_temp_fan_temp(self, temp_fan, target, callback=None, *args, timeout=None):
         logging.debug(f"Sending temperature fan {temp_fan} to temp: {target}")
         return self._ws.send_method(
             "printer.gcode.script",
@@ -321,10 +620,11 @@ class MoonrakerApi:
                 "script": KlippyGcodes.set_temp_fan_temp(temp_fan, target)
             },
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
-    def set_tool_temp(self, tool, target, callback=None, *args):
+    def set_tool_temp(self, tool, target, callback=None, *args, timeout=None):
         logging.debug(f"Sending set_tool_temp: {KlippyGcodes.set_ext_temp(target, tool)}")
         return self._ws.send_method(
             "printer.gcode.script",
@@ -332,7 +632,8 @@ class MoonrakerApi:
                 "script": KlippyGcodes.set_ext_temp(target, tool)
             },
             callback,
-            *args
+            *args,
+            timeout=timeout
         )
 
     def restart(self):
@@ -1,5 +1,6 @@
 import configparser
 import gettext
+import hashlib
 import os
 import logging
 import json
@@ -7,6 +8,7 @@ import re
 import copy
 import pathlib
 import locale
+import shutil
 
 from io import StringIO
 
@@ -21,6 +23,56 @@ SCREEN_BLANKING_OPTIONS = [
     14400,  # 4 Hours
 ]
 
+# Names shown in the language pickers, codes without an entry are shown as is
+LANGUAGE_NAMES = {
+    'bg': 'Български',
+    'ps': 'Pashto',
+    'es': 'Español',
+    'en': 'English',
+    'et': 'Eesti',
+    'pt': 'Português',
+    'zh': '中文',
+    'ar': 'العربية',
+    'fr': 'Français',
+    'de': 'Deutsch',
+    'el': 'Ελληνικά',
+    'hi': 'हिन्दी',
+    'id': 'Bahasa Indonesia',
+    'fa': 'فارسی',
+    'ga': 'Gaeilge',
+    'gu': 'ગુજરાતી',
+    'it': 'Italiano',
+    'ja': '日本語',
+    'sw': 'Kiswahili',
+    'ms': 'Bahasa Melayu',
+    'nl': 'Nederlands',
+    'mi': 'Te Reo Māori',
+    'ur': 'پاکستان',
+    'fil': 'Filipino ',
+    'pl': 'Polski',
+    'pt_BR': 'Português (Brasil)',
+    'ru': 'Русский',
+    'zu': 'isiZulu',
+    'ko': '한국어',
+    'sl': 'Slovenščina',
+    'sv': 'Svenska',
+    'th': 'ไทย',
+    'tr': 'Türkçe',
+    'vi': 'Tiếng Việt',
+    'fi': 'Suomi',
+    'no': 'Norsk',
+    'cs': 'Čeština',
+    'da': 'Dansk',
+    'he': 'עברית',
+    'hu': 'Magyar',
+    'jp': '日本語',
+    'uk': 'Українська',
+    'zh_CN': '简体中文',
+    'zh_TW': '繁體中文',
+    'de_formal': 'Deutsch (Formal)',
+    'lt': 'lietuvių',
+}
+
 klipperscreendir = pathlib.Path(__file__).parent.resolve().parent
 
 
@@ -44,6 +96,8 @@ class KlipperScreenConfig:
         self.defined_config = None
         self.lang = None
         self.langs = {}
+        self.lang_path = os.path.join(klipperscreendir, "ks_includes", "locales")
+        self.languages = None
 
         try:
             self.config.read(self.default_config_path)
@@ -108,12 +162,8 @@ class KlipperScreenConfig:
         self._create_configurable_options(screen)
 
     def create_translations(self):
-        lang_path = os.path.join(klipperscreendir, "ks_includes", "locales")
-        self.lang_list = [d for d in os.listdir(lang_path) if not os.path.isfile(os.path.join(lang_path, d))]
-        self.lang_list.sort()
-        for lng in self.lang_list:
-            self.langs[lng] = gettext.translation('KlipperScreen', localedir=lang_path, languages=[lng], fallback=True)
-
+        # Only the active language is loaded, the rest when they are picked
+        self.lang_list = list(self.get_languages())
         lang = self.get_main_config().get("language", None)
         logging.debug(f"Selected lang: {lang} OS lang: {locale.getlocale()[0]}")
         self.install_language(lang)
@@ -135,7 +185,7 @@ class KlipperScreenConfig:
             logging.info(f"Available lang list {self.lang_list}")
             lang = "en"
         logging.info(f"Using lang {lang}")
-        self.lang = self.langs[lang]
+        self.lang = self.get_translation(lang)
         self.lang.install(names=['gettext', 'ngettext'])
 
     def validate_config(self, config, string="", remove=False):
@@ -160,11 +210,13 @@ class KlipperScreenConfig:
                 )
                 strs = (
                     'default_printer', 'language', 'print_sort_dir', 'screen_blanking', 
-                    'print_estimate_method', 'screen_blanking',  "screen_off_devices",
+                    'print_estimate_method', 'screen_blanking',  "screen_off_devices", 'moonraker_transport',
                 )
                 numbers = (
                     'job_complete_timeout', 'job_error_timeout', 'move_speed_xy', 'move_speed_z',
-                    'print_estimate_compensation', 'width', 'height',
+                    'print_estimate_compensation', 'width', 'height', 'status_update_window',
+                    'metadata_cache_size', 'thumbnail_cache_size', 'thumbnail_disk_cache_size',
+                    'rest_pool_size', 'rest_retries',
                 )
             elif section.startswith('printer '):
                 bools = (
@@ -435,9 +487,50 @@ class KlipperScreenConfig:
     def get_configurable_options(self):
         return self.configurable_options
 
+    def get_languages(self):
+        """Code: name of the available translations, from the directory listing without opening the .mo files"""
+        if self.languages is None:
+            self.languages = {
+                lng: LANGUAGE_NAMES.get(lng, lng) for lng in sorted(os.listdir(self.lang_path))
+                if os.path.isdir(os.path.join(self.lang_path, lng))
+            }
+        return self.languages
+
+    def get_translation(self, lang):
+        if lang not in self.langs:
+            self.langs[lang] = gettext.translation('KlipperScreen', localedir=self.lang_path, languages=[lang],
+                                                   fallback=True)
+        return self.langs[lang]
+
     def get_lang(self):
         return self.lang
 
+    def get_cache_dir(self):
+        # Never next to the config, that directory is edited, backed up and synced, and the caches can be large
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        cache_dir = os.path.join(cache_home, "KlipperScreen")
+        if self.config_path == self.default_config_path:
+            return cache_dir
+        # One per config file, printer names are only unique within a config
+        name = pathlib.Path(self.config_path).stem
+        digest = hashlib.sha1(os.path.realpath(self.config_path).encode()).hexdigest()[:8]
+        return os.path.join(cache_dir, f"{name}_{digest}")
+
+    def clear_cache_dir(self):
+        """Removes everything in the cache directory: gcode metadata, thumbnails and the icon atlas"""
+        cache_dir = self.get_cache_dir()
+        if not os.path.isdir(cache_dir):
+            return
+        for entry in os.scandir(cache_dir):
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+            except OSError as e:
+                logging.error(f"Couldn't remove {entry.path}: {e}")
+        logging.info(f"Cleared the cache in {cache_dir}")
+
     def get_main_config(self):
         return self.config['main']
 
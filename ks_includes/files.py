@@ -5,16 +5,29 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib
+from ks_includes.metadata_cache import MetadataCache
 
 
 class KlippyFiles:
+    # File change notifications arriving within this many ms are applied and reported together
+    update_delay = 250
+
     def __init__(self, screen):
         self._screen = screen
         self.callbacks = []
+        # path: last item notified or None if deleted, waiting for flush_updates
+        self.pending_updates = {}
+        self.pending_mods = set()
+        self.pending_list = False
+        self.update_timer = None
+        # Insertion ordered registry, path: info
         self.files = {}
-        self.filelist = []
+        # directory: set of paths directly inside it, "" is the gcodes root
+        self.dir_index = {}
         self.directories = []
+        self.directory_paths = set()
         self.gcodes_path = None
+        self.cache = None
 
     def initialize(self):
         if "virtual_sdcard" in self._screen.printer.get_config_section_list():
@@ -22,34 +35,63 @@ class KlippyFiles:
             if "path" in vsd:
                 self.gcodes_path = os.path.expanduser(vsd['path'])
         logging.info(f"Gcodes path: {self.gcodes_path}")
+        cache_size = self._screen._config.get_main_config().getint("metadata_cache_size", 10000)
+        if cache_size > 0 and self.cache is None:
+            self.cache = MetadataCache(self._screen._config.get_cache_dir(), self._screen.connected_printer, cache_size)
+            self.load_cache()
+
+    def load_cache(self):
+        for filename, info in self.cache.load().items():
+            if filename not in self.files:
+                self._register(filename, dict(info))
+        if self.files:
+            self.run_callbacks(newfiles=list(self.files))
+
+    def clear_cache(self):
+        if self.cache is not None:
+            self.cache.clear()
 
     def reset(self):
+        if self.update_timer is not None:
+            GLib.source_remove(self.update_timer)
+            self.update_timer = None
+        if self.cache is not None and self.cache.save_timer is not None:
+            GLib.source_remove(self.cache.save_timer)
+            self.cache.save()
+        self.cache = None
         self._screen = None
         self.callbacks = None
         self.files = None
-        self.filelist = None
+        self.dir_index = None
         self.directories = None
+        self.directory_paths = None
         self.gcodes_path = None
 
     def _callback(self, result, method, params):
         if method == "server.files.list":
             if "result" in result and isinstance(result['result'], list):
                 newfiles = []
-                deletedfiles = self.filelist.copy()
+                listed = set()
                 for item in result['result']:
                     file = item['filename'] if "filename" in item else item['path']
+                    listed.add(file)
                     if file in self.files:
-                        deletedfiles.remove(file)
+                        if self.files[file]['modified'] != item['modified'] or self.files[file]['size'] != item['size']:
+                            self.files[file] = {"size": item['size'], "modified": item['modified']}
+                            if self.cache is not None:
+                                self.cache.discard(file)
+                            self.request_metadata(file)
                     else:
                         newfiles.append(file)
                         self.add_file(item, False)
+                deletedfiles = [file for file in self.files if file not in listed]
 
                 if newfiles or len(deletedfiles) > 0:
                     self.run_callbacks(newfiles, deletedfiles)
 
                 if len(deletedfiles) > 0:
                     for file in deletedfiles:
-                        self.remove_file(file)
+                        self.remove_file(file, False)
         elif method == "server.files.directory":
             if "result" in result:
                 directory = params['path'][7:] if params['path'].startswith('gcodes/') else params['path']
@@ -59,7 +101,7 @@ class KlippyFiles:
                 newfiles = []
                 for file in result['result']['files']:
                     fullpath = f"{directory}/{file['filename']}"
-                    if fullpath not in self.filelist:
+                    if fullpath not in self.files:
                         newfiles.append(fullpath)
 
                 if newfiles:
@@ -68,6 +110,8 @@ class KlippyFiles:
             if "error" in result.keys():
                 logging.debug(f"Error in getting metadata for {params['filename']}. Retrying in 6 seconds")
                 return
+            if params['filename'] not in self.files:
+                return
 
             for x in result['result']:
                 self.files[params['filename']][x] = result['result'][x]
@@ -86,14 +130,19 @@ class KlippyFiles:
                     if thumbnail['local'] is False:
                         fdir = os.path.dirname(params['filename'])
                         thumbnail['path'] = os.path.join(fdir, thumbnail['relative_path'])
-            self.run_callbacks(mods=[params['filename']])
+            if self.cache is not None:
+                self.cache.put(params['filename'], self.files[params['filename']])
+            self.pending_mods.add(params['filename'])
+            self.schedule_updates()
         elif method == "server.files.get_directory":
             if 'result' not in result or 'dirs' not in result['result']:
                 return
             for x in result['result']['dirs']:
-                if x not in self.directories and not x['dirname'].startswith('.'):
+                path = f"{params['path']}/{x['dirname']}"
+                if path not in self.directory_paths and not x['dirname'].startswith('.'):
+                    self.directory_paths.add(path)
                     self.directories.append(x)
-                    self.get_dir_info(f"{params['path']}/{x['dirname']}")
+                    self.get_dir_info(path)
 
     def add_file(self, item, notify=True):
         if 'filename' not in item and 'path' not in item:
@@ -101,22 +150,37 @@ class KlippyFiles:
             return
 
         filename = item['path'] if "path" in item else item['filename']
-        if filename in self.filelist:
+        if filename in self.files:
             logging.info(f"File already exists: {filename}")
             self.request_metadata(filename)
             args = None, None, [filename]
             GLib.idle_add(self.run_callbacks, *args)
             return
 
-        self.filelist.append(filename)
-        self.files[filename] = {
-            "size": item['size'],
-            "modified": item['modified']
-        }
-        self.request_metadata(filename)
+        cached = self.cache.get(filename, item['modified'], item['size']) if self.cache is not None else None
+        if cached is not None:
+            self._register(filename, dict(cached))
+        else:
+            self._register(filename, {
+                "size": item['size'],
+                "modified": item['modified']
+            })
+            self.request_metadata(filename)
         if notify is True:
             self.run_callbacks(newfiles=[filename])
 
+    def _register(self, filename, info):
+        self.files[filename] = info
+        self.dir_index.setdefault(os.path.dirname(filename), set()).add(filename)
+
+    def _unregister(self, filename):
+        self.files.pop(filename, None)
+        directory = os.path.dirname(filename)
+        if directory in self.dir_index:
+            self.dir_index[directory].discard(filename)
+            if not self.dir_index[directory]:
+                del self.dir_index[directory]
+
     def add_file_callback(self, callback):
         try:
             self.callbacks.append(callback)
@@ -124,21 +188,55 @@ class KlippyFiles:
             logging.debug(f"Callback not found: {callback}:\n{e}")
 
     def process_update(self, data):
+        """Queues a notify_filelist_changed, only the last state of each path is applied by flush_updates"""
         if 'item' in data and data['item']['root'] != 'gcodes':
             return
 
-        if data['action'] == "create_dir":
-            self._screen._ws.klippy.get_file_dir(f"gcodes/{data['item']['path']}", self._callback)
-        elif data['action'] == "create_file":
-            self.add_file(data['item'])
+        if data['action'] in ("create_dir", "delete_dir", "move_dir"):
+            # Files inside directories aren't notified one by one, the file list is diffed instead
+            self.pending_list = True
+        elif data['action'] in ("create_file", "modify_file"):
+            self.pending_updates[data['item']['path']] = data['item']
         elif data['action'] == "delete_file":
-            self.remove_file(data['item']['path'])
-        elif data['action'] == "modify_file":
-            self.request_metadata(data['item']['path'])
+            self.pending_updates[data['item']['path']] = None
         elif data['action'] == "move_file":
-            self.add_file(data['item'], False)
-            self.remove_file(data['source_item']['path'], False)
-            self.run_callbacks(newfiles=[data['item']['path']], deletedfiles=[data['source_item']['path']])
+            self.pending_updates[data['source_item']['path']] = None
+            self.pending_updates[data['item']['path']] = data['item']
+        else:
+            return False
+        self.schedule_updates()
+        return False
+
+    def schedule_updates(self):
+        if self.update_timer is None:
+            self.update_timer = GLib.timeout_add(self.update_delay, self.flush_updates)
+
+    def flush_updates(self):
+        self.update_timer = None
+        newfiles, deletedfiles, mods = [], [], self.pending_mods
+        updates, self.pending_updates, self.pending_mods = self.pending_updates, {}, set()
+        for path, item in updates.items():
+            if item is None:
+                if path in self.files:
+                    self.remove_file(path, False)
+                    deletedfiles.append(path)
+            elif path not in self.files:
+                self.add_file(item, False)
+                newfiles.append(path)
+            else:
+                # Not in place, the old dict is the cached entry
+                self.files[path] = {"size": item['size'], "modified": item['modified']}
+                if self.cache is not None:
+                    self.cache.discard(path)
+                self.request_metadata(path)
+                mods.add(path)
+        if self.pending_list:
+            self.pending_list = False
+            self._screen._ws.klippy.get_file_list(self._callback)
+        mods = [path for path in mods if path in self.files and path not in newfiles]
+        if newfiles or deletedfiles or mods:
+            logging.debug(f"File updates: {len(newfiles)} new, {len(deletedfiles)} deleted, {len(mods)} modified")
+            self.run_callbacks(newfiles, deletedfiles, mods)
         return False
 
     def remove_file_callback(self, callback):
@@ -146,7 +244,7 @@ class KlippyFiles:
             self.callbacks.pop(self.callbacks.index(callback))
 
     def file_exists(self, filename):
-        return filename in self.filelist
+        return filename in self.files
 
     def file_metadata_exists(self, filename):
         if self.file_exists(filename):
@@ -169,9 +267,9 @@ class KlippyFiles:
         return "thumbnails" in self.files[filename] and len(self.files[filename]) > 0
 
     def request_metadata(self, filename):
-        if filename not in self.filelist:
+        if filename not in self.files:
             return False
-        self._screen._ws.klippy.get_file_metadata(filename, self._callback)
+        self._screen._ws.klippy.get_file_metadata(filename, self._callback, batch=True)
 
     def refresh_files(self):
         self._screen._ws.klippy.get_file_list(self._callback)
@@ -179,11 +277,12 @@ class KlippyFiles:
         return False
 
     def remove_file(self, filename, notify=True):
-        if filename not in self.filelist:
+        if filename not in self.files:
             return
 
-        self.filelist.remove(filename)
-        self.files.pop(filename, None)
+        self._unregister(filename)
+        if self.cache is not None:
+            self.cache.discard(filename)
 
         if notify is True:
             self.run_callbacks(deletedfiles=[filename])
@@ -203,7 +302,11 @@ class KlippyFiles:
         return False
 
     def get_file_list(self):
-        return self.filelist
+        return list(self.files)
+
+    def get_directory_files(self, directory=""):
+        """Paths of the files directly inside directory, relative to the gcodes root"""
+        return self.dir_index.get(directory, set())
 
     def get_file_info(self, filename):
         if filename not in self.files:
@@ -211,4 +314,4 @@ class KlippyFiles:
         return self.files[filename]
 
     def get_dir_info(self, directory):
-        self._screen._ws.klippy.get_dir_info(self._callback, directory=directory)
+        self._screen._ws.klippy.get_dir_info(self._callback, directory=directory, batch=True)
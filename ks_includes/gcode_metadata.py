@@ -0,0 +1,160 @@
+import logging
+import os
+import queue
+import re
+import threading
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+from ks_includes.metadata_cache import MetadataCache
+
+# Slicers write their settings and estimates as comments, Cura in the header, PrusaSlicer and Orca
+# in the footer before (or inside) a config block that can be a few hundred kB long
+PATTERNS = (
+    ("slicer", re.compile(r"^; generated by (\S+)(?: (\S+))?", re.I | re.M)),
+    ("slicer", re.compile(r"^;Generated with (\S+?)(?:_SteamEngine)?(?: (\S+))?$", re.M)),
+    ("estimated_time", re.compile(r"^; estimated printing time(?: \(normal mode\))? = (.+)$", re.M)),
+    ("estimated_time", re.compile(r"; total estimated time: ([^;\n]+)")),
+    ("estimated_time", re.compile(r"^;TIME:(\d+)", re.M)),
+    ("estimated_time", re.compile(r"^;PRINT\.TIME:(\d+)", re.M)),
+    ("filament_total", re.compile(r"^; filament used \[mm\] = ([\d.]+)", re.M)),
+    ("filament_total", re.compile(r"^;Filament used: ([\d.]+)m", re.M)),
+    ("filament_weight_total", re.compile(r"^; (?:total )?filament used \[g\] = ([\d.]+)", re.M)),
+    ("layer_height", re.compile(r"^; layer_height = ([\d.]+)", re.M)),
+    ("layer_height", re.compile(r"^;Layer height: ([\d.]+)", re.M)),
+)
+
+
+def parse_duration(text):
+    """Seconds from '1d 2h 3m 4s' or a plain number of seconds"""
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    total = 0
+    for value, unit in re.findall(r"(\d+)\s*([dhms])", text):
+        total += int(value) * {"d": 86400, "h": 3600, "m": 60, "s": 1}[unit]
+    return total
+
+
+def parse_metadata(text, info=None):
+    """Adds the values found in text to info, values already in info are kept"""
+    info = {} if info is None else info
+    for key, pattern in PATTERNS:
+        if key in info:
+            continue
+        match = pattern.search(text)
+        if match is None:
+            continue
+        if key == "slicer":
+            info["slicer"] = match.group(1)
+            if match.group(2):
+                info["slicer_version"] = match.group(2)
+        elif key == "estimated_time":
+            info[key] = parse_duration(match.group(1))
+        elif key == "filament_total" and match.group(0).startswith(";Filament"):
+            info[key] = float(match.group(1)) * 1000
+        else:
+            info[key] = float(match.group(1))
+    return info
+
+
+def read_metadata(path, head_size=65536, tail_size=65536, tail_limit=1048576):
+    """Reads the slicer metadata of a gcode file without reading the whole file.
+
+    The head is read once, the tail backwards in tail_size blocks until an estimated time shows up
+    or tail_limit bytes were read.
+    """
+    stat = os.stat(path)
+    info = {"size": stat.st_size, "modified": stat.st_mtime}
+    with open(path, "rb") as file:
+        head = file.read(head_size)
+        parse_metadata(head.decode("utf-8", "replace"), info)
+        end = stat.st_size
+        # Start of the block parsed before, up to its first line break, completed by the next block
+        partial = b""
+        while "estimated_time" not in info and end > len(head) and stat.st_size - end < tail_limit:
+            start = max(end - tail_size, len(head))
+            file.seek(start)
+            block = file.read(end - start) + partial
+            end = start
+            # Start at a line boundary so a partial line can't match
+            if start > len(head):
+                cut = block.find(b"\n") + 1 or len(block)
+                partial, block = block[:cut], block[cut:]
+            parse_metadata(block.decode("utf-8", "replace"), info)
+    return info
+
+
+class GcodeMetadataReader:
+    """Reads the metadata of local gcode files on a background thread.
+
+    Results are cached by modified time and size, in memory and persisted with MetadataCache,
+    callbacks run on the main loop.
+    """
+
+    def __init__(self, cache_dir=None, name="local"):
+        self.cache = None
+        if cache_dir is not None:
+            # In its own directory, the printer caches use the printer name and it could be the same
+            self.cache = MetadataCache(os.path.join(cache_dir, "gcode"), name)
+        self.cache_loaded = False
+        self.entries = {}
+        self.pending = {}
+        self.queue = queue.Queue()
+        threading.Thread(target=self._work, name="gcode-metadata", daemon=True).start()
+
+    def get(self, path):
+        """Returns the cached metadata of path or None if it needs to be read"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        info = self.entries.get(path)
+        if info is not None and info["modified"] == stat.st_mtime and info["size"] == stat.st_size:
+            return info
+        info = None
+        if self.cache is not None:
+            if not self.cache_loaded:
+                self.cache.load()
+                self.cache_loaded = True
+            info = self.cache.get(path, stat.st_mtime, stat.st_size)
+            if info is not None:
+                self.entries[path] = info
+        return info
+
+    def request(self, path, callback, *args):
+        """Returns the metadata if cached, otherwise reads it and calls callback(path, info, *args) later"""
+        info = self.get(path)
+        if info is not None:
+            return info
+        if path in self.pending:
+            if (callback, args) not in self.pending[path]:
+                self.pending[path].append((callback, args))
+        else:
+            self.pending[path] = [(callback, args)]
+            self.queue.put(path)
+        return None
+
+    def cancel(self, path):
+        self.pending.pop(path, None)
+
+    def _work(self):
+        while True:
+            path = self.queue.get()
+            try:
+                info = read_metadata(path)
+            except OSError as e:
+                logging.info(f"Couldn't read metadata of {path}: {e}")
+                info = None
+            GLib.idle_add(self._deliver, path, info)
+
+    def _deliver(self, path, info):
+        if info is not None:
+            self.entries[path] = info
+            if self.cache is not None:
+                self.cache.put(path, info)
+        for callback, args in self.pending.pop(path, []):
+            callback(path, info, *args)
+        return False
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GdkPixbuf
+
+
+class IconAtlas:
+    """Theme icons rasterised to PNG for the sizes in use, listed in a manifest.
+
+    Only SVGs are worth it, decoding a PNG is cheap. Icons are added as the UI rasterises them, so the atlas
+    holds what was actually shown. Each theme, resolution and font size combination gets its own directory,
+    so changing any of them starts a new atlas. Entries remember the modified time of their source, they are
+    checked once per run on the background thread that also writes the icons.
+    """
+    version = 1
+
+    def __init__(self, cache_dir, signature):
+        self.signature = signature
+        self.root = os.path.join(cache_dir, "icons")
+        self.dir = os.path.join(self.root, re.sub(r'[^A-Za-z0-9_.-]', '_', signature))
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+        self.lock = threading.Lock()
+        self.icons = {}
+        self.dirty = False
+        self.hits = 0
+        self.queue = queue.Queue()
+        self.load_manifest()
+        threading.Thread(target=self._work, name="icon-atlas", daemon=True).start()
+
+    @staticmethod
+    def entry_name(name, width, height):
+        return f"{name}@{width}x{height}"
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding="utf-8") as file:
+                manifest = json.load(file)
+            if manifest.get("version") == self.version and manifest.get("signature") == self.signature:
+                self.icons = manifest.get("icons", {})
+                logging.info(f"Icon atlas {self.dir}: {len(self.icons)} icons")
+                return
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.info(f"Discarding icon atlas manifest: {e}")
+        logging.info(f"Creating icon atlas {self.dir}")
+
+    def get(self, name, width, height):
+        """Returns the pre-rasterised pixbuf or None if it isn't in the atlas"""
+        entry_name = self.entry_name(name, width, height)
+        with self.lock:
+            entry = self.icons.get(entry_name)
+        if entry is None:
+            return None
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file(os.path.join(self.dir, entry['file']))
+        except Exception as e:
+            logging.debug(f"Icon atlas entry {entry['file']} unusable: {e}")
+            with self.lock:
+                self.icons.pop(entry_name, None)
+                self.dirty = True
+            return None
+        self.hits += 1
+        return pixbuf
+
+    def add(self, name, width, height, source, pixbuf):
+        self.queue.put((name, width, height, source, pixbuf))
+
+    def _work(self):
+        try:
+            self.remove_stale()
+            self.remove_outdated()
+        except Exception as e:
+            logging.exception(f"Icon atlas: {e}")
+        while True:
+            task = self.queue.get()
+            try:
+                self._store(*task)
+            except Exception as e:
+                logging.exception(f"Icon atlas: {e}")
+            if self.queue.empty():
+                self.save_manifest()
+
+    def remove_outdated(self):
+        """Drops the entries whose source changed or is gone, the icons are rasterised again when used"""
+        with self.lock:
+            entries = list(self.icons.items())
+        outdated = []
+        for entry_name, entry in entries:
+            try:
+                if os.stat(entry['source']).st_mtime != entry['source_mtime']:
+                    outdated.append(entry_name)
+            except OSError:
+                outdated.append(entry_name)
+        if not outdated:
+            return
+        logging.info(f"Icon atlas: {len(outdated)} icons changed in the theme")
+        with self.lock:
+            for entry_name in outdated:
+                self.icons.pop(entry_name, None)
+            self.dirty = True
+        self.save_manifest()
+
+    def _store(self, name, width, height, source, pixbuf):
+        entry_name = self.entry_name(name, width, height)
+        file = f"{entry_name.replace(os.sep, '__')}.png"
+        os.makedirs(self.dir, exist_ok=True)
+        path = os.path.join(self.dir, file)
+        pixbuf.savev(f"{path}.tmp", "png", [], [])
+        os.replace(f"{path}.tmp", path)
+        with self.lock:
+            self.icons[entry_name] = {"file": file, "source": source, "source_mtime": os.stat(source).st_mtime}
+            self.dirty = True
+
+    def save_manifest(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            manifest = {"version": self.version, "signature": self.signature, "icons": dict(self.icons)}
+            self.dirty = False
+        try:
+            with open(f"{self.manifest_path}.tmp", "w", encoding="utf-8") as file:
+                json.dump(manifest, file, separators=(',', ':'))
+            os.replace(f"{self.manifest_path}.tmp", self.manifest_path)
+        except OSError as e:
+            logging.error(f"Couldn't save icon atlas manifest: {e}")
+
+    def remove_stale(self):
+        """Deletes the atlases of other themes, resolutions or font sizes"""
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.path != self.dir:
+                logging.info(f"Removing stale icon atlas {entry.path}")
+                shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,51 @@
+import json
+import logging
+
+# Name: (loads, dumps), ordered by preference
+CODECS = {}
+
+try:
+    import orjson
+
+    CODECS["orjson"] = (orjson.loads, orjson.dumps)
+except ImportError:
+    pass
+
+try:
+    import ujson
+
+    CODECS["ujson"] = (ujson.loads, ujson.dumps)
+except ImportError:
+    pass
+
+CODECS["json"] = (json.loads, json.dumps)
+
+
+class JsonCodec:
+    """Encodes and decodes websocket frames with the fastest available json library.
+
+    Anything the fast library rejects (NaN, non-string keys, etc) is handled by the stdlib json.
+    """
+
+    def __init__(self, name=None):
+        if name not in CODECS:
+            name = next(iter(CODECS))
+        self.name = name
+        self._loads, self._dumps = CODECS[name]
+        logging.info(f"Using {self.name} to decode websocket messages")
+
+    def loads(self, data):
+        try:
+            return self._loads(data)
+        except ValueError:
+            if self._loads is json.loads:
+                raise
+            return json.loads(data)
+
+    def dumps(self, obj):
+        try:
+            return self._dumps(obj)
+        except TypeError:
+            if self._dumps is json.dumps:
+                raise
+            return json.dumps(obj)
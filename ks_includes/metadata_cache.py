@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+import re
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+
+class MetadataCache:
+    """Gcode metadata persisted between runs, an entry is valid while the file keeps its modified time and size.
+
+    Stored as a single json file, entries beyond max_entries are dropped oldest (by modified time) first.
+    """
+    version = 1
+    save_delay = 5
+
+    def __init__(self, cache_dir, name, max_entries=10000):
+        self.max_entries = max_entries
+        self.path = os.path.join(cache_dir, f"metadata_{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.json")
+        self.entries = {}
+        self.save_timer = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.info(f"Discarding metadata cache {self.path}: {e}")
+            return {}
+        if data.get("version") != self.version:
+            return {}
+        self.entries = data.get("files", {})
+        logging.info(f"Loaded metadata of {len(self.entries)} files from {self.path}")
+        return self.entries
+
+    def get(self, filename, modified, size):
+        entry = self.entries.get(filename)
+        if entry is None or entry.get("modified") != modified or entry.get("size") != size:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, filename, info):
+        self.entries[filename] = info
+        self.schedule_save()
+
+    def discard(self, filename):
+        if self.entries.pop(filename, None) is not None:
+            self.schedule_save()
+
+    def schedule_save(self):
+        if self.save_timer is None:
+            self.save_timer = GLib.timeout_add_seconds(self.save_delay, self.save)
+
+    def save(self):
+        self.save_timer = None
+        if len(self.entries) > self.max_entries:
+            newest = sorted(self.entries, key=lambda x: self.entries[x].get("modified", 0), reverse=True)
+            for filename in newest[self.max_entries:]:
+                del self.entries[filename]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as file:
+                json.dump({"version": self.version, "files": self.entries}, file, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.error(f"Couldn't save metadata cache {self.path}: {e}")
+        logging.debug(f"Saved metadata cache: {len(self.entries)} files, {self.hits} hits, {self.misses} misses")
+        return False
+
+    def clear(self):
+        if self.save_timer is not None:
+            GLib.source_remove(self.save_timer)
+            self.save_timer = None
+        self.entries = {}
+        self.remove(self.path)
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+            logging.info(f"Removed metadata cache {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Couldn't remove metadata cache {path}: {e}")
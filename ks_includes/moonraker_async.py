@@ -0,0 +1,174 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+
+from ks_includes.KlippyRest import KlippyRest
+from ks_includes.KlippyWebsocket import KlippyWebsocket
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def available():
+    return aiohttp is not None
+
+
+class AsyncTransport:
+    """An asyncio loop on its own thread with one aiohttp session, shared by the websocket and the HTTP requests.
+
+    Blocking callers use call(), it must never be used from the loop thread itself.
+    """
+
+    def __init__(self, pool_size=4):
+        self.pool_size = pool_size
+        self.session = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="moonraker-asyncio", daemon=True)
+        self.thread.start()
+        self.call(self._open())
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _open(self):
+        # The websocket holds one connection for as long as it's open
+        connector = aiohttp.TCPConnector(limit=self.pool_size + 1)
+        self.session = aiohttp.ClientSession(connector=connector)
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, coro, timeout=None):
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("AsyncTransport.call would block its own loop")
+        if self.loop.is_closed():
+            coro.close()
+            raise ConnectionError("Transport closed")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        if not self.loop.is_running():
+            return
+        try:
+            self.call(self.session.close(), 5)
+        except Exception as e:
+            logging.debug(f"Error closing the aiohttp session: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class AsyncKlippyRest(KlippyRest):
+    """KlippyRest running its requests on an AsyncTransport, calls still block until the response arrives"""
+
+    backoff = .2
+
+    def __init__(self, transport, ip, port=7125, api_key=False, retries=2):
+        self.transport = transport
+        self.retries = retries
+        super().__init__(ip, port, api_key, transport.pool_size, retries)
+
+    def create_session(self, pool_size, retries):
+        return self.transport.session
+
+    def fetch(self, url, request_method, data, json, json_response, timeout, retry=True):
+        try:
+            return self.transport.call(self._fetch(url, request_method, data, json, json_response, timeout, retry),
+                                       timeout + 1)
+        except (asyncio.TimeoutError, concurrent.futures.TimeoutError) as e:
+            # These have no message, format_status would leave the status empty
+            raise ConnectionError(f"Timed out after {timeout}s waiting for {url}") from e
+
+    async def _fetch(self, url, request_method, data, json, json_response, timeout, retry):
+        headers = {"x-api-key": self.api_key} if self.api_key else None
+        # Same policy as the threaded client, only idempotent requests are retried when the connection fails
+        attempts = self.retries + 1 if retry and request_method.lower() == "get" else 1
+        for attempt in range(attempts):
+            try:
+                async with self.session.request(request_method.upper(), url, json=json, data=data, headers=headers,
+                                                timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    response.raise_for_status()
+                    if json_response:
+                        return await response.json(content_type=None)
+                    return await response.read()
+            except aiohttp.ClientConnectorError:
+                if attempt + 1 == attempts:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncKlippyWebsocket(KlippyWebsocket):
+    """KlippyWebsocket reading and writing on an AsyncTransport instead of a websocket-client thread"""
+
+    def __init__(self, transport, screen, callback, host, port):
+        super().__init__(screen, callback, host, port)
+        self.transport = transport
+
+    def start_websocket(self):
+        logging.debug("Starting websocket task")
+        self.transport.submit(self._run_websocket())
+        return False
+
+    async def _run_websocket(self):
+        try:
+            # Moonraker replies can be several MB, for example the file list
+            self.ws = await self.transport.session.ws_connect(self.ws_url, max_msg_size=0)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.on_error(None, e)
+            self.on_close(None, None, None)
+            return
+        ws = self.ws
+        self.on_open(ws)
+        try:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self.on_message(ws, msg.data)
+                elif msg.type == aiohttp.WSMsgType.BINARY:
+                    self.on_message(ws, msg.data.decode())
+                elif msg.type == aiohttp.WSMsgType.ERROR:
+                    self.on_error(ws, ws.exception())
+                    break
+        except Exception as e:
+            logging.exception(e)
+        self.on_close(ws, ws.close_code, "Connection closed")
+
+    def transmit(self, payload, requests):
+        ws = self.ws
+        if ws is None or ws.closed:
+            raise ConnectionError("Websocket is closed")
+        if isinstance(payload, bytes):
+            payload = payload.decode()
+        # Tasks start in submission order and write the whole frame before yielding, so requests stay in order
+        self.transport.submit(ws.send_str(payload)).add_done_callback(lambda future: self._sent(future, requests))
+
+    def _sent(self, future, requests):
+        if future.cancelled():
+            error = "cancelled"
+        elif future.exception() is not None:
+            error = future.exception()
+        else:
+            return
+        # Already marked as sent, without a response they would wait forever (untimed) or until they expire
+        logging.debug(f"Couldn't send {len(requests)} requests: {error}")
+        for request in requests:
+            self.resolve_request(request.id, self.error_response(request.id, 503, "Not connected to Moonraker"))
+
+    def close(self):
+        self.closing = True
+        self.connecting = False
+        if self.ws is not None and not self.ws.closed:
+            self.transport.submit(self.ws.close())
+
+    def stop_websocket(self):
+        self.close()
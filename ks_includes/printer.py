@@ -3,6 +3,7 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib
+from ks_includes.ringbuffer import RingBuffer
 
 
 class Printer:
@@ -31,6 +32,7 @@ class Printer:
         self.temp_devices = self.sensors = None
         self.system_info = {}
         self.warnings = []
+        self.subscriptions = {}
 
     def reinit(self, printer_info, data):
         self.config = data['configfile']['config']
@@ -120,16 +122,51 @@ class Printer:
                 for i in data[x]:
                     self.set_dev_stat(x, i, data[x][i])
 
+        changed = set()
         for x in data:
             if x == "configfile":
                 continue
             if x not in self.data:
                 self.data[x] = {}
+            for field in data[x]:
+                if field not in self.data[x] or self.data[x][field] != data[x][field]:
+                    changed.add((x, field))
             self.data[x].update(data[x])
+        if changed:
+            self.notify_subscribers(changed)
 
         if "webhooks" in data or "print_stats" in data or "idle_timeout" in data:
             self.process_status_update()
 
+    def subscribe(self, callback, keys):
+        """Calls callback(changed) with the (object, field) keys that changed and match keys.
+
+        A key is either an object name, matching all its fields, or an (object, field) tuple.
+        The callback is called right away with the matching keys that already have a value.
+        """
+        self.subscriptions[callback] = set(keys)
+        current = {(x, field) for x in self.data if x != "configfile" for field in self.data[x]}
+        matched = self.match_keys(self.subscriptions[callback], current)
+        if matched:
+            callback(matched)
+
+    def unsubscribe(self, callback):
+        self.subscriptions.pop(callback, None)
+
+    def notify_subscribers(self, changed):
+        for callback, keys in list(self.subscriptions.items()):
+            matched = self.match_keys(keys, changed)
+            if matched:
+                # A failing subscriber must not stop the others or the rest of the update
+                try:
+                    callback(matched)
+                except Exception as e:
+                    logging.exception(f"Error in status subscriber {callback}: {e}")
+
+    @staticmethod
+    def match_keys(keys, changed):
+        return {key for key in changed if key in keys or key[0] in keys}
+
     def evaluate_state(self):
         # webhooks states: startup, ready, shutdown, error
         # print_stats: standby, printing, paused, error, complete
@@ -371,16 +408,14 @@ class Printer:
         if section is not False:
             if section not in self.tempstore[device]:
                 return False
-            if results == 0 or results >= len(self.tempstore[device][section]):
-                return self.tempstore[device][section]
-            return self.tempstore[device][section][-results:]
+            return self.tempstore[device][section].last(results)
 
-        temp = {}
-        for section in self.tempstore[device]:
-            if results == 0 or results >= len(self.tempstore[device][section]):
-                temp[section] = self.tempstore[device][section]
-            temp[section] = self.tempstore[device][section][-results:]
-        return temp
+        return {section: self.tempstore[device][section].last(results) for section in self.tempstore[device]}
+
+    def get_temp_store_count(self, device, section):
+        if device not in self.tempstore or section not in self.tempstore[device]:
+            return 0
+        return self.tempstore[device][section].count
 
     def get_temp_devices(self):
         devices = [
@@ -397,18 +432,16 @@ class Printer:
         return self.tools.index(tool)
 
     def init_temp_store(self, tempstore):
+        for device in tempstore:
+            for x in tempstore[device]:
+                values = tempstore[device][x]
+                tempstore[device][x] = RingBuffer(max(self.tempstore_size, len(values)), values)
         if self.tempstore and list(self.tempstore) != list(tempstore):
             logging.debug("Tempstore has changed")
             self.tempstore = tempstore
             self.change_state(self.state)
         else:
             self.tempstore = tempstore
-        for device in self.tempstore:
-            for x in self.tempstore[device]:
-                length = len(self.tempstore[device][x])
-                if length < self.tempstore_size:
-                    for _ in range(1, self.tempstore_size - length):
-                        self.tempstore[device][x].insert(0, 0)
         logging.info(f"Temp store: {list(self.tempstore)}")
 
     def config_section_exists(self, section):
@@ -425,11 +458,7 @@ class Printer:
             return False
         for device in self.tempstore:
             for x in self.tempstore[device]:
-                self.tempstore[device][x].pop(0)
-                temp = self.get_dev_stat(device, x[:-1])
-                if temp is None:
-                    temp = 0
-                self.tempstore[device][x].append(temp)
+                self.tempstore[device][x].append(self.get_dev_stat(device, x[:-1]))
         return True
 
     def enable_spoolman(self):
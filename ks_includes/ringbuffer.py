@@ -0,0 +1,44 @@
+from array import array
+
+
+class RingBuffer:
+    """Fixed capacity buffer of floats, the newest sample is always the last one.
+
+    Every sample is written twice (at cursor and cursor + capacity), this way the last n samples
+    are always contiguous and can be returned as a zero-copy memoryview.
+    """
+
+    def __init__(self, capacity, data=None):
+        self.capacity = max(int(capacity), 1)
+        self._buf = array('f', bytes(2 * self.capacity * array('f').itemsize))
+        self._view = memoryview(self._buf)
+        self._cursor = 0
+        self.count = 0
+        if data:
+            self.extend(data[-self.capacity:])
+
+    def append(self, value):
+        value = value or 0
+        self._buf[self._cursor] = value
+        self._buf[self._cursor + self.capacity] = value
+        self._cursor = (self._cursor + 1) % self.capacity
+        self.count += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def last(self, results=0):
+        if results <= 0 or results > self.capacity:
+            results = self.capacity
+        end = self._cursor + self.capacity
+        return self._view[end - results:end]
+
+    def __len__(self):
+        return self.capacity
+
+    def __iter__(self):
+        return iter(self.last())
+
+    def __getitem__(self, index):
+        return self.last()[index]
@@ -47,18 +47,9 @@ class ScreenPanel:
             self._screen._ws.klippy.emergency_stop()
 
     def get_file_image(self, filename, width=None, height=None, small=False):
-        if not self._files.has_thumbnail(filename):
-            return None
-        loc = self._files.get_thumbnail_location(filename, small)
-        if loc is None:
-            return None
         width = width if width is not None else self._gtk.img_width
         height = height if height is not None else self._gtk.img_height
-        if loc[0] == "file":
-            return self._gtk.PixbufFromFile(loc[1], width, height)
-        if loc[0] == "http":
-            return self._gtk.PixbufFromHttp(loc[1], width, height)
-        return None
+        return self._screen.thumbnails.get(filename, width, height, small)
 
     def menu_item_clicked(self, widget, item):
         if 'extra' in item:
@@ -189,10 +180,10 @@ class ScreenPanel:
             new_label_text += f" {int(power * 100):3}%"
 
         if dev in self.labels:
-            self.labels[dev].set_label(new_label_text)
+            self._gtk.set_label(self.labels[dev], new_label_text)
             if show_power:
                 self.labels[dev].get_style_context().add_class("heater-grid-temp-power")
             else:
                 self.labels[dev].get_style_context().remove_class("heater-grid-temp-power")
         elif dev in self.devices:
-            self.devices[dev]["temp"].get_child().set_label(new_label_text)
+            self._gtk.set_label(self.devices[dev]["temp"].get_child(), new_label_text)
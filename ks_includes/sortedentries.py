@@ -0,0 +1,81 @@
+from bisect import bisect_left, insort
+
+
+class SortedEntries:
+    """Items kept in order by one of their cached sort keys.
+
+    keys is a dict of sort kind: value given when adding the item, switching kinds re-sorts with the
+    cached values and reversing only changes how positions are mapped. Ties are broken by the item itself.
+    Bulk loads use append() and get sorted once on the next lookup.
+    """
+
+    def __init__(self, kind, reverse=False):
+        self.kind = kind
+        self.reverse = reverse
+        self.keys = {}
+        self._entries = []
+        self._dirty = False
+
+    @property
+    def _order(self):
+        if self._dirty:
+            self._entries.sort()
+            self._dirty = False
+        return self._entries
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, item):
+        return item in self.keys
+
+    def __iter__(self):
+        order = reversed(self._order) if self.reverse else self._order
+        return (item for _, item in order)
+
+    def __getitem__(self, pos):
+        if pos < 0:
+            pos += len(self._order)
+        if self.reverse:
+            pos = len(self._order) - 1 - pos
+        return self._order[pos][1]
+
+    def _position(self, index):
+        return len(self.keys) - 1 - index if self.reverse else index
+
+    def _entry(self, item):
+        return self.keys[item][self.kind], item
+
+    def index(self, item):
+        return self._position(bisect_left(self._order, self._entry(item)))
+
+    def add(self, item, keys):
+        """Returns the position of the new item"""
+        if item in self.keys:
+            return self.index(item)
+        self.keys[item] = keys
+        insort(self._order, self._entry(item))
+        return self.index(item)
+
+    def append(self, item, keys):
+        if item not in self.keys:
+            self.keys[item] = keys
+            self._entries.append(self._entry(item))
+            self._dirty = True
+
+    def remove(self, item):
+        """Returns the position the item had or None if it wasn't there"""
+        if item not in self.keys:
+            return None
+        index = bisect_left(self._order, self._entry(item))
+        pos = self._position(index)
+        del self._order[index]
+        del self.keys[item]
+        return pos
+
+    def set_order(self, kind, reverse=False):
+        if kind != self.kind:
+            self.kind = kind
+            self._entries = [self._entry(item) for item in self.keys]
+            self._dirty = True
+        self.reverse = reverse
@@ -0,0 +1,165 @@
+import builtins
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Span:
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.end = None
+        self.children = []
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def self_time(self):
+        return self.duration - sum(child.duration for child in self.children)
+
+
+class StartupProfiler:
+    """Records nested wall-clock spans of the startup, main thread only, does nothing until enabled.
+
+    Imports are timed by wrapping builtins.__import__, modules loaded with importlib.import_module
+    need their own span.
+    The report is a Chrome trace (chrome://tracing, Perfetto, speedscope) and folded stacks for flamegraph.pl
+    """
+
+    # Imports faster than this (seconds) are merged into their parent
+    min_import = .001
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = None
+        self.roots = []
+        self.stack = []
+        self.thread = None
+        self._import = None
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.thread = threading.get_ident()
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() != self.thread:
+            return self._import(name, globals, locals, fromlist, level)
+        module = name
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            package = package.rsplit(".", level - 1)[0] if level > 1 else package
+            module = f"{package}.{name}" if name else package
+        # from x import y can still load y, gi.repository does the heavy lifting that way
+        label = f"import {module}"
+        if (module in sys.modules and not fromlist) or (self.stack and self.stack[-1].name == label):
+            return self._import(name, globals, locals, fromlist, level)
+        self.begin(label)
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            span = self.end()
+            if span is not None and span.duration < self.min_import and not span.children:
+                self.discard(span)
+
+    def begin(self, name):
+        if not self.enabled or threading.get_ident() != self.thread:
+            return None
+        span = Span(name, time.perf_counter())
+        (self.stack[-1].children if self.stack else self.roots).append(span)
+        self.stack.append(span)
+        return span
+
+    def end(self, name=None):
+        """Closes the innermost span, or every span up to the one called name"""
+        if not self.enabled or not self.stack or threading.get_ident() != self.thread:
+            return None
+        now = time.perf_counter()
+        while self.stack:
+            span = self.stack.pop()
+            span.end = now
+            if name is None or span.name == name:
+                return span
+        return None
+
+    def discard(self, span):
+        siblings = self.stack[-1].children if self.stack else self.roots
+        if span in siblings:
+            siblings.remove(span)
+
+    @contextmanager
+    def span(self, name):
+        span = self.begin(name)
+        try:
+            yield span
+        finally:
+            if span is not None:
+                self.end(name)
+
+    def mark(self, name):
+        """A zero length span, for events like the first frame"""
+        span = self.begin(name)
+        if span is not None:
+            self.end(name)
+
+    def walk(self, spans=None, path=()):
+        for span in self.roots if spans is None else spans:
+            yield path + (span.name,), span
+            yield from self.walk(span.children, path + (span.name,))
+
+    def trace_events(self):
+        pid = os.getpid()
+        return [{
+            "name": span.name, "ph": "X", "pid": pid, "tid": self.thread,
+            "ts": round((span.start - self.origin) * 1e6), "dur": round(span.duration * 1e6),
+        } for _, span in self.walk()]
+
+    def folded(self):
+        # flamegraph.pl takes "frame;frame;frame value", the value is the self time in microseconds
+        lines = []
+        for path, span in self.walk():
+            self_time = round(span.self_time * 1e6)
+            if self_time > 0:
+                lines.append(f"{';'.join(name.replace(';', ':') for name in path)} {self_time}")
+        return lines
+
+    def finish(self, directory, name="KlipperScreen-startup"):
+        """Stops recording and writes name.json and name.folded to directory, returns the json path"""
+        if not self.enabled:
+            return None
+        while self.stack:
+            self.end()
+        builtins.__import__ = self._import
+        self.enabled = False
+        total = max((span.end for span in self.roots), default=self.origin) - self.origin
+        for span in self.roots:
+            logging.info(f"Startup: {span.name} {span.duration * 1000:.0f} ms")
+        logging.info(f"Startup: {total * 1000:.0f} ms to the first frame")
+        path = os.path.join(directory, f"{name}.json")
+        try:
+            with open(path, "w") as f:
+                json.dump({
+                    "traceEvents": self.trace_events(),
+                    "displayTimeUnit": "ms",
+                    "otherData": {"total_ms": round(total * 1000, 1), "argv": sys.argv},
+                }, f)
+            with open(os.path.join(directory, f"{name}.folded"), "w") as f:
+                f.write("\n".join(self.folded()) + "\n")
+        except OSError as e:
+            logging.error(f"Couldn't write the startup profile: {e}")
+            return None
+        logging.info(f"Startup profile written to {path}")
+        return path
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+
+class TaskAbort(Exception):
+    """Raised by a task to stop the graph, message is passed to the done callback"""
+
+    def __init__(self, message=None):
+        super().__init__(message)
+        self.message = message
+
+
+class Task:
+    def __init__(self, name, func, deps, main):
+        self.name = name
+        self.func = func
+        self.deps = set(deps)
+        self.main = main
+        self.ready = self.start = self.end = None
+
+
+class TaskGraph:
+    """Runs named tasks once the tasks they depend on are done, independent ones in parallel.
+
+    Tasks receive the dict of results so far and return their own. Worker tasks run on a thread pool and
+    must not touch GTK, main tasks run on the main loop and are where results get applied.
+    done(results, error) is called on the main loop, error is None or the TaskAbort that stopped the graph.
+    """
+
+    def __init__(self, name, workers=4):
+        self.name = name
+        self.workers = workers
+        self.tasks = {}
+        self.results = {}
+        self.lock = threading.Lock()
+        self.pool = None
+        self.done = None
+        self.pending = set()
+        self.running = False
+        self.started = None
+
+    def add(self, name, func, deps=(), main=False):
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"{name} depends on unknown task {dep}")
+        self.tasks[name] = Task(name, func, deps, main)
+
+    def run(self, done):
+        self.done = done
+        for task in self.tasks.values():
+            task.ready = task.start = task.end = None
+        self.results = {}
+        self.pending = set(self.tasks)
+        self.running = True
+        self.started = time.monotonic()
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        with self.lock:
+            self._schedule()
+
+    def cancel(self):
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+        logging.info(f"{self.name}: cancelled")
+        self.pool.shutdown(wait=False)
+
+    def _schedule(self):
+        # Called with the lock held
+        for task in [self.tasks[name] for name in self.pending]:
+            if task.ready is None and not task.deps - self.results.keys():
+                task.ready = time.monotonic()
+                if task.main:
+                    GLib.idle_add(self._run_task, task)
+                else:
+                    self.pool.submit(self._run_task, task)
+
+    def _run_task(self, task):
+        if not self.running:
+            return False
+        task.start = time.monotonic()
+        try:
+            result = task.func(self.results)
+        except TaskAbort as e:
+            GLib.idle_add(self._finish, task, e)
+            return False
+        except Exception as e:
+            logging.exception(f"{self.name}: {task.name} failed")
+            GLib.idle_add(self._finish, task, TaskAbort(f"{task.name}: {e}"))
+            return False
+        task.end = time.monotonic()
+        with self.lock:
+            if not self.running:
+                return False
+            self.results[task.name] = result
+            self.pending.discard(task.name)
+            if self.pending:
+                self._schedule()
+                return False
+        GLib.idle_add(self._finish, None, None)
+        return False
+
+    def _finish(self, task, error):
+        with self.lock:
+            if not self.running:
+                return False
+            self.running = False
+        self.pool.shutdown(wait=False)
+        if error is not None:
+            logging.info(f"{self.name}: stopped at {task.name}: {error.message}")
+        self.log_timings()
+        self.done(self.results, error)
+        return False
+
+    def log_timings(self):
+        steps = sorted((task for task in self.tasks.values() if task.end is not None), key=lambda x: x.start)
+        for task in steps:
+            logging.debug(f"{self.name}: {task.name} {'main' if task.main else 'worker'} "
+                          f"started at {(task.start - self.started) * 1000:.0f} ms, "
+                          f"waited {(task.start - task.ready) * 1000:.0f} ms, "
+                          f"took {(task.end - task.start) * 1000:.0f} ms")
+        logging.info(f"{self.name}: {len(steps)} of {len(self.tasks)} steps "
+                     f"in {(time.monotonic() - self.started) * 1000:.0f} ms")
@@ -0,0 +1,269 @@
+import hashlib
+import heapq
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import suppress
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GdkPixbuf, GLib
+
+
+class ThumbnailCache:
+    """Decoded thumbnails in memory, least recently used first out when over max_bytes,
+    backed by pre-scaled PNGs on disk.
+
+    Keys are (gcode path, modified time, width, height), a re-sliced file never gets a stale image.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, max_disk_bytes=0):
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.bytes = 0
+        self.disk_dir = disk_dir if max_disk_bytes > 0 else None
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_bytes = None
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    @staticmethod
+    def key(path, modified, width, height):
+        return path, modified, int(width), int(height)
+
+    def get(self, key):
+        with self.lock:
+            pixbuf = self.memory.get(key)
+            if pixbuf is not None:
+                self.memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return pixbuf
+        pixbuf = self._disk_get(key)
+        with self.lock:
+            if pixbuf is None:
+                self.misses += 1
+                if self.misses % 100 == 0:
+                    logging.debug(f"Thumbnail cache: {self.stats()}")
+                return None
+            self.hits["disk"] += 1
+            self._memory_put(key, pixbuf)
+        return pixbuf
+
+    def put(self, key, pixbuf):
+        with self.lock:
+            self._memory_put(key, pixbuf)
+        self._disk_put(key, pixbuf)
+
+    def _memory_put(self, key, pixbuf):
+        size = pixbuf.get_byte_length()
+        if size > self.max_bytes:
+            return
+        if key in self.memory:
+            self.bytes -= self.memory.pop(key).get_byte_length()
+        self.memory[key] = pixbuf
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self.bytes -= self.memory.popitem(last=False)[1].get_byte_length()
+
+    def disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{hashlib.sha1(repr(key).encode()).hexdigest()}.png")
+
+    def _disk_get(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self.disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file(path)
+            os.utime(path)
+            return pixbuf
+        except Exception as e:
+            logging.debug(f"Discarding cached thumbnail {path}: {e}")
+            with suppress(OSError):
+                os.remove(path)
+            return None
+
+    def _disk_put(self, key, pixbuf):
+        if self.disk_dir is None:
+            return
+        path = self.disk_path(key)
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            pixbuf.savev(f"{path}.tmp", "png", [], [])
+            os.replace(f"{path}.tmp", path)
+            size = os.path.getsize(path)
+        except Exception as e:
+            logging.error(f"Couldn't save thumbnail {path}: {e}")
+            return
+        with self.lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.disk_dir))
+            else:
+                self.disk_bytes += size
+            if self.disk_bytes > self.max_disk_bytes:
+                self._disk_prune()
+
+    def _disk_prune(self):
+        # Oldest used first, down to 80% to avoid pruning on every write
+        entries = sorted(os.scandir(self.disk_dir), key=lambda x: x.stat().st_mtime)
+        for entry in entries:
+            if self.disk_bytes <= self.max_disk_bytes * .8:
+                break
+            with suppress(OSError):
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.disk_bytes -= size
+
+    def stats(self):
+        return {
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.misses,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.bytes,
+            "disk_bytes": self.disk_bytes,
+        }
+
+
+class ThumbnailJob:
+    def __init__(self, key, filename, loc, width, height, callback, args, priority):
+        self.key = key
+        self.filename = filename
+        # (location, modified)
+        self.loc = loc
+        self.width = width
+        self.height = height
+        self.callback = callback
+        self.args = args
+        self.priority = priority
+        # heap entry while queued, None once a worker picked it up
+        self.entry = None
+
+
+class ThumbnailLoader:
+    """Fetches and decodes thumbnails on a small pool of worker threads.
+
+    Jobs are identified by a key, queued jobs with the lowest priority value are loaded first,
+    and the callback receives the pixbuf (or None) on the main loop unless the job was cancelled.
+    get() loads synchronously, both go through the cache.
+    """
+    workers = 2
+
+    def __init__(self, screen):
+        self._screen = screen
+        self._gtk = screen.gtk
+        main_config = screen._config.get_main_config()
+        self.cache = ThumbnailCache(
+            main_config.getint("thumbnail_cache_size", 16) * 1024 * 1024,
+            os.path.join(screen._config.get_cache_dir(), "thumbnails"),
+            main_config.getint("thumbnail_disk_cache_size", 64) * 1024 * 1024
+        )
+        self.lock = threading.Condition()
+        self.queue = []
+        self.jobs = {}
+        self.seq = 0
+        self.loaded = 0
+        self.cancelled = 0
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"thumbnails-{i}", daemon=True).start()
+
+    def location(self, filename, small=False):
+        """Returns the thumbnail location and the modified time of the file or None"""
+        files = self._screen.files
+        if files is None or not files.has_thumbnail(filename):
+            return None
+        return files.get_thumbnail_location(filename, small), files.get_file_info(filename)['modified']
+
+    def get(self, filename, width, height, small=False):
+        location = self.location(filename, small)
+        if location is None:
+            return None
+        return self.get_pixbuf(filename, *location, width, height)
+
+    def get_pixbuf(self, filename, loc, modified, width, height):
+        key = ThumbnailCache.key(filename, modified, width, height)
+        pixbuf = self.cache.get(key)
+        if pixbuf is None:
+            pixbuf = self.load_pixbuf(loc, width, height)
+            if pixbuf is not None:
+                self.cache.put(key, pixbuf)
+        return pixbuf
+
+    def load(self, key, filename, width, height, callback, *args, small=False, priority=0, locate=None):
+        """locate(filename, small) replaces location() for files Moonraker doesn't list"""
+        location = (locate or self.location)(filename, small)
+        if location is None:
+            callback(None, *args)
+            return
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None and job.filename == filename and job.loc == location \
+                    and (job.width, job.height) == (width, height):
+                if job.entry is not None and job.priority != priority:
+                    self._push(job, priority)
+                return
+            self._cancel(key)
+            job = ThumbnailJob(key, filename, location, width, height, callback, args, priority)
+            self.jobs[key] = job
+            self._push(job, priority)
+            self.lock.notify()
+
+    def pending(self, key):
+        return key in self.jobs
+
+    def cancel(self, key):
+        with self.lock:
+            self._cancel(key)
+
+    def _cancel(self, key):
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            self.cancelled += 1
+            if job.entry is not None:
+                job.entry[2] = None
+                job.entry = None
+
+    def _push(self, job, priority):
+        # Reprioritising leaves the old heap entry behind without a job
+        if job.entry is not None:
+            job.entry[2] = None
+        self.seq += 1
+        job.priority = priority
+        job.entry = [priority, self.seq, job]
+        heapq.heappush(self.queue, job.entry)
+
+    def _work(self):
+        while True:
+            with self.lock:
+                job = None
+                while job is None:
+                    while not self.queue:
+                        self.lock.wait()
+                    job = heapq.heappop(self.queue)[2]
+                job.entry = None
+            try:
+                pixbuf = self.get_pixbuf(job.filename, *job.loc, job.width, job.height)
+            except Exception as e:
+                logging.exception(f"Couldn't load thumbnail of {job.filename}: {e}")
+                pixbuf = None
+            GLib.idle_add(self._deliver, job, pixbuf)
+
+    def load_pixbuf(self, loc, width, height):
+        if loc[0] == "file":
+            return self._gtk.PixbufFromFile(loc[1], width, height)
+        if loc[0] == "http":
+            return self._gtk.PixbufFromHttp(loc[1], width, height)
+        return None
+
+    def _deliver(self, job, pixbuf):
+        with self.lock:
+            if self.jobs.get(job.key) is not job:
+                return False
+            del self.jobs[job.key]
+            self.loaded += 1
+        job.callback(pixbuf, *job.args)
+        return False
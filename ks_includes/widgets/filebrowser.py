@@ -0,0 +1,475 @@
+import logging
+import math
+import os
+from datetime import datetime
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GLib, Pango
+from ks_includes.screen_panel import ScreenPanel
+from ks_includes.sortedentries import SortedEntries
+
+
+class FileBrowser(Gtk.Box):
+    """Browsable tree of files backed by one sorted model per directory.
+
+    Files are given relative to root and directories are keyed as root/path. The panel supplies the files, their info,
+    the info text, what clicking a file does and any extra row buttons; rows are only built when they are about
+    to be seen and the thumbnails of the rows in view are loaded first.
+    paged lays out one page of page_size rows in columns instead of a scrolled list.
+    """
+    # Rows are built in pages as they get close to the visible area of the scroll
+    page_size = 20
+    # Above this many new files at once it's cheaper to rebuild the model
+    reload_threshold = 100
+
+    def __init__(self, screen, root, file_list, file_info, info_markup, file_clicked, row_actions=None, locate=None,
+                 dir_modified=None, dir_changed=None, sort=("name", 0), paged=False, columns=1, page_size=None):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self._screen = screen
+        self._gtk = screen.gtk
+        self.root = root
+        self.file_list = file_list
+        # file_info(path) returns a dict with at least 'modified' and 'size' or None to hide the file
+        self.file_info = file_info
+        self.info_markup = info_markup
+        self.file_clicked = file_clicked
+        # row_actions(row, fullpath, filename) attaches buttons to the row, filename is None for directories
+        self.row_actions = row_actions
+        # locate(path, small) returns the thumbnail location, see ThumbnailLoader.location
+        self.locate = locate
+        self.dir_modified = dir_modified
+        self.dir_changed = dir_changed
+        self.sort_current = list(sort)
+        self.paged = paged
+        self.columns = columns
+        if page_size is not None:
+            self.page_size = page_size
+        self.page = 0
+        self.cur_directory = root
+        self.time_24 = screen._config.get_main_config().getboolean("24htime", True)
+        self.space = '  ' if screen.width > 480 else '\n'
+        self.filelist = {root: self.new_dir_model()}
+        self.shown = {root: 0}
+        # Built rows still waiting for their thumbnail
+        self.thumbs_missing = set()
+        self.thumbs_timer = None
+        self.files = {}
+        self.directories = {}
+        self.labels = {'files': {}, 'directories': {}}
+        self.dir_panels = {root: Gtk.Grid()}
+        if paged:
+            self.view = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        else:
+            self.view = self._gtk.ScrolledWindow()
+            self.view.get_vadjustment().connect("value-changed", self.check_scroll)
+            self.view.get_vadjustment().connect("changed", self.check_scroll)
+        self.set_dir_panel(root)
+        self.pack_start(self.view, True, True, 0)
+
+    def set_dir_panel(self, directory):
+        for child in self.view.get_children():
+            self.view.remove(child)
+        if self.paged:
+            self.view.pack_start(self.dir_panels[directory], True, True, 0)
+        else:
+            self.view.add(self.dir_panels[directory])
+
+    def add_directory(self, directory, show=True):
+        parent_dir = os.path.dirname(directory)
+        if directory not in self.filelist:
+            pos = self.add_directory_model(directory)
+            self.insert_row(parent_dir, pos, show)
+
+    def add_directory_model(self, directory, insert=True):
+        parent_dir = os.path.dirname(directory)
+        modified = self.dir_modified(directory) if self.dir_modified is not None else 0
+        self.filelist[directory] = self.new_dir_model(modified)
+        self.shown[directory] = 0
+        if directory not in self.dir_panels:
+            self.dir_panels[directory] = Gtk.Grid()
+        keys = {"name": directory, "date": modified}
+        if not insert:
+            return self.filelist[parent_dir]['directories'].append(directory, keys)
+        return self.filelist[parent_dir]['directories'].add(directory, keys)
+
+    def new_dir_model(self, modified=0):
+        reverse = self.sort_current[1] != 0
+        return {
+            'directories': SortedEntries(self.sort_current[0], reverse),
+            'files': SortedEntries(self.sort_current[0], reverse),
+            'modified': modified
+        }
+
+    def add_file(self, filepath, show=True):
+        directory = self.add_file_model(filepath)
+        if directory is None:
+            return False
+        pos = self.filelist[directory]['files'].index(os.path.basename(filepath))
+        self.insert_row(directory, pos + len(self.filelist[directory]['directories']), show)
+        return False
+
+    def add_file_model(self, filepath, rows=True):
+        """Adds the file and its parent directories to the model, returns the directory or None if hidden
+
+        rows: insert in order and build the rows of new parent directories,
+        otherwise the entries are appended and the caller builds the rows once the model is complete.
+        """
+        fileinfo = self.file_info(filepath)
+        if fileinfo is None:
+            return None
+        filename = os.path.basename(filepath)
+        if filename.startswith("."):
+            return None
+        directory = os.path.dirname(os.path.join(self.root, filepath))
+        d = directory.split(os.sep)
+        for i in range(1, len(d)):
+            newdir = os.path.join(*d[:i + 1])
+            if newdir not in self.filelist:
+                if newdir.startswith("."):
+                    return None
+                if rows:
+                    self.add_directory(newdir)
+                else:
+                    self.add_directory_model(newdir, insert=False)
+
+        if filename in self.filelist[directory]['files']:
+            return None
+        for i in range(1, len(d)):
+            curdir = os.path.join(*d[:i + 1])
+            if self.time_24:
+                time = f":<b>{self.space}" \
+                       f"{datetime.fromtimestamp(self.filelist[curdir]['modified']):%Y/%m/%d %H:%M}</b>"
+            else:
+                time = f":<b>{self.space}" \
+                       f"{datetime.fromtimestamp(self.filelist[curdir]['modified']):%Y/%m/%d %I:%M %p}</b>"
+            info = _("Modified") + time
+            info += "\n" + _("Size") + f':<b>{self.space}{ScreenPanel.format_size(fileinfo["size"])}</b>'
+            self.filelist[curdir]['info'] = info
+            if curdir in self.labels['directories']:
+                self.labels['directories'][curdir]['info'].set_markup(info)
+        keys = {"name": filename, "date": fileinfo['modified']}
+        if rows:
+            self.filelist[directory]['files'].add(filename, keys)
+        else:
+            self.filelist[directory]['files'].append(filename, keys)
+        return directory
+
+    def file_path(self, directory, filename):
+        return f"{directory}/{filename}"[len(self.root) + 1:]
+
+    def entry_at(self, directory, pos):
+        """Returns (fullpath, filename) of the row at pos, filename is None for directories"""
+        dirs = self.filelist[directory]['directories']
+        if pos < len(dirs):
+            return dirs[pos], None
+        filename = self.filelist[directory]['files'][pos - len(dirs)]
+        return self.file_path(directory, filename), filename
+
+    def entry_count(self, directory):
+        return len(self.filelist[directory]['directories']) + len(self.filelist[directory]['files'])
+
+    def insert_row(self, directory, pos, show=True):
+        if self.paged:
+            if directory == self.cur_directory:
+                self.show_page()
+            return
+        # Rows past the built ones are created when they are scrolled into view
+        if pos >= self.shown[directory]:
+            if directory == self.cur_directory:
+                self.check_scroll()
+            return
+        row = self.get_row(*self.entry_at(directory, pos))
+        self.dir_panels[directory].insert_row(pos)
+        self.dir_panels[directory].attach(row, 0, pos, 1, 1)
+        self.shown[directory] += 1
+        if show is True:
+            self.dir_panels[directory].show_all()
+
+    def remove_row(self, directory, pos):
+        if self.paged:
+            if directory == self.cur_directory:
+                self.show_page()
+            return
+        if pos < self.shown[directory]:
+            self.dir_panels[directory].remove_row(pos)
+            self.shown[directory] -= 1
+
+    def show_rows(self, directory, count):
+        count = min(count, self.entry_count(directory))
+        if count <= self.shown[directory]:
+            return
+        for pos in range(self.shown[directory], count):
+            self.dir_panels[directory].attach(self.get_row(*self.entry_at(directory, pos)), 0, pos, 1, 1)
+        self.shown[directory] = count
+        self.dir_panels[directory].show_all()
+
+    def page_count(self):
+        return max(1, math.ceil(self.entry_count(self.cur_directory) / self.page_size))
+
+    def show_page(self, page=None):
+        if page is not None:
+            self.page = page
+        self.page = max(0, min(self.page, self.page_count() - 1))
+        grid = self.dir_panels[self.cur_directory]
+        for child in grid.get_children():
+            grid.remove(child)
+        start = self.page * self.page_size
+        end = min(start + self.page_size, self.entry_count(self.cur_directory))
+        for i, pos in enumerate(range(start, end)):
+            row = self.get_row(*self.entry_at(self.cur_directory, pos))
+            grid.attach(row, i % self.columns, i // self.columns, 1, 1)
+        grid.show_all()
+        self.schedule_thumbnails()
+
+    def layout(self, directory):
+        """Lays out the rows of directory again from the model"""
+        if self.paged:
+            if directory == self.cur_directory:
+                self.show_page()
+            return
+        for child in self.dir_panels[directory].get_children():
+            self.dir_panels[directory].remove(child)
+        shown = self.shown[directory]
+        self.shown[directory] = 0
+        self.show_rows(directory, max(shown, self.page_size if directory == self.cur_directory else 0))
+
+    def check_scroll(self, *args):
+        if self.paged or self.cur_directory not in self.shown or not self.view.get_mapped():
+            return
+        adj = self.view.get_vadjustment()
+        if adj.get_value() + 2 * adj.get_page_size() >= adj.get_upper():
+            self.show_rows(self.cur_directory, self.shown[self.cur_directory] + self.page_size)
+        self.schedule_thumbnails()
+
+    def schedule_thumbnails(self):
+        # Rows get their final allocation after the adjustment signals
+        if self.thumbs_missing and self.thumbs_timer is None:
+            self.thumbs_timer = GLib.idle_add(self.update_thumbnails)
+
+    def update_thumbnails(self):
+        """Loads thumbnails of the rows in or near the view, closest first, and cancels the rest"""
+        self.thumbs_timer = None
+        if self.paged:
+            for filepath in list(self.thumbs_missing):
+                row = self.files.get(filepath)
+                if row is None or row.get_parent() is None:
+                    self._screen.thumbnails.cancel((self.root, filepath))
+                else:
+                    self.image_load(filepath)
+            return False
+        adj = self.view.get_vadjustment()
+        top = adj.get_value()
+        page = adj.get_page_size()
+        for filepath in list(self.thumbs_missing):
+            row = self.files.get(filepath)
+            if row is None:
+                self.thumbs_missing.discard(filepath)
+                self._screen.thumbnails.cancel((self.root, filepath))
+                continue
+            alloc = row.get_allocation()
+            if not row.get_mapped() or alloc.y + alloc.height < top - page or alloc.y > top + 2 * page:
+                self._screen.thumbnails.cancel((self.root, filepath))
+            elif alloc.y + alloc.height >= top and alloc.y <= top + page:
+                self.image_load(filepath)
+            else:
+                self.image_load(filepath, priority=min(abs(alloc.y - top - page), abs(alloc.y + alloc.height - top)))
+        return False
+
+    def get_row(self, fullpath, filename=None):
+        rows = self.directories if filename is None else self.files
+        if fullpath in rows:
+            return rows[fullpath]
+        return self._create_row(fullpath, filename)
+
+    def _create_row(self, fullpath, filename=None):
+        name = Gtk.Label()
+        name.get_style_context().add_class("print-filename")
+        if filename:
+            name.set_markup(f'<big><b>{os.path.splitext(filename)[0].replace("_", " ")}</b></big>')
+        else:
+            name.set_markup(f"<big><b>{os.path.split(fullpath)[-1]}</b></big>")
+        name.set_hexpand(True)
+        name.set_halign(Gtk.Align.START)
+        name.set_line_wrap(True)
+        name.set_line_wrap_mode(Pango.WrapMode.CHAR)
+
+        info = Gtk.Label()
+        info.set_line_wrap_mode(Pango.WrapMode.CHAR)
+        info.set_hexpand(True)
+        info.set_halign(Gtk.Align.START)
+        info.get_style_context().add_class("print-info")
+
+        if filename:
+            info.set_markup(self.info_markup(fullpath) or "")
+            icon = Gtk.Button()
+            icon.connect("clicked", self.file_clicked, fullpath)
+            self.thumbs_missing.add(fullpath)
+            self.schedule_thumbnails()
+        else:
+            icon = self._gtk.Button("folder")
+            icon.connect("clicked", self.change_dir, fullpath)
+            if 'info' in self.filelist[fullpath]:
+                info.set_markup(self.filelist[fullpath]['info'])
+        icon.set_hexpand(False)
+
+        row = Gtk.Grid()
+        row.get_style_context().add_class("frame-item")
+        row.set_hexpand(True)
+        row.set_vexpand(self.paged)
+        row.attach(icon, 0, 0, 1, 2)
+        row.attach(name, 1, 0, 3, 1)
+        row.attach(info, 1, 1, 1, 1)
+        if self.row_actions is not None:
+            self.row_actions(row, fullpath, filename)
+
+        if filename is not None:
+            self.files[fullpath] = row
+            self.labels['files'][fullpath] = {
+                "icon": icon,
+                "info": info,
+                "name": name
+            }
+        else:
+            self.directories[fullpath] = row
+            self.labels['directories'][fullpath] = {
+                "info": info,
+                "name": name
+            }
+        return row
+
+    def image_load(self, filepath, priority=0):
+        if filepath not in self.labels['files']:
+            return False
+        self._screen.thumbnails.load(
+            (self.root, filepath), filepath, self._gtk.img_width, self._gtk.img_height,
+            self.set_thumbnail, filepath, small=True, priority=priority, locate=self.locate
+        )
+        return False
+
+    def set_thumbnail(self, pixbuf, filepath):
+        self.thumbs_missing.discard(filepath)
+        if filepath not in self.labels['files']:
+            return
+        if pixbuf is not None:
+            self.labels['files'][filepath]['icon'].set_image(Gtk.Image.new_from_pixbuf(pixbuf))
+        else:
+            self.labels['files'][filepath]['icon'].set_image(self._gtk.Image("file"))
+
+    def back(self):
+        if os.path.dirname(self.cur_directory):
+            self.change_dir(None, os.path.dirname(self.cur_directory))
+            return True
+        return False
+
+    def change_dir(self, widget, directory):
+        if directory not in self.dir_panels:
+            return
+        logging.debug(f"Changing dir to {directory}")
+        self.cur_directory = directory
+        self.set_dir_panel(directory)
+        if self.paged:
+            self.show_page(0)
+        else:
+            self.show_rows(directory, self.page_size)
+        if self.dir_changed is not None:
+            self.dir_changed(directory)
+        self.show_all()
+
+    def set_sort(self, key, reverse=False):
+        """Reorders the models with their cached keys and lays out the built rows again"""
+        self.sort_current = [key, 1 if reverse else 0]
+        for directory, entry in self.filelist.items():
+            entry['directories'].set_order(key, reverse)
+            entry['files'].set_order(key, reverse)
+            self.layout(directory)
+        return False
+
+    def delete_file(self, filename):
+        directory = os.path.join(self.root, os.path.dirname(filename)) if os.path.dirname(filename) else self.root
+        if directory not in self.filelist or os.path.basename(filename).startswith("."):
+            return
+        pos = self.filelist[directory]['files'].remove(os.path.basename(filename))
+        if pos is not None:
+            self.remove_row(directory, pos + len(self.filelist[directory]['directories']))
+        self.files.pop(filename, None)
+        self.labels['files'].pop(filename, None)
+        self.thumbs_missing.discard(filename)
+        self._screen.thumbnails.cancel((self.root, filename))
+        dir_parts = directory.split(os.sep)
+        i = len(dir_parts)
+        while i > 1:
+            cur_dir = os.path.join(*dir_parts[:i])
+            if len(self.filelist[cur_dir]['directories']) > 0 or len(self.filelist[cur_dir]['files']) > 0:
+                break
+            parent_dir = os.path.dirname(cur_dir)
+
+            if self.cur_directory == cur_dir:
+                self.change_dir(None, parent_dir)
+
+            del self.filelist[cur_dir]
+            del self.shown[cur_dir]
+            self.remove_row(parent_dir, self.filelist[parent_dir]['directories'].remove(cur_dir))
+            self.directories.pop(cur_dir, None)
+            self.labels['directories'].pop(cur_dir, None)
+            i -= 1
+
+    def update_file(self, filename):
+        directory = os.path.join(self.root, os.path.dirname(filename)) if os.path.dirname(filename) else self.root
+        fileinfo = self.file_info(filename)
+        if directory not in self.filelist or fileinfo is None:
+            return
+        entries = self.filelist[directory]['files']
+        name = os.path.basename(filename)
+        if name not in entries:
+            return
+        modified = entries.keys[name]['date'] != fileinfo['modified']
+        if modified:
+            # The position is cached with the old date, move the entry to where it now sorts
+            dirs = len(self.filelist[directory]['directories'])
+            self.remove_row(directory, entries.remove(name) + dirs)
+            self.insert_row(directory, entries.add(name, {"name": name, "date": fileinfo['modified']}) + dirs)
+        if filename not in self.labels['files']:
+            return
+        self.labels['files'][filename]['info'].set_markup(self.info_markup(filename) or "")
+        if modified:
+            self.thumbs_missing.add(filename)
+            self.schedule_thumbnails()
+
+    def reload(self, *args):
+        self.filelist = {self.root: self.new_dir_model()}
+        self.shown = {self.root: 0}
+        for filepath in self.thumbs_missing:
+            self._screen.thumbnails.cancel((self.root, filepath))
+        self.thumbs_missing.clear()
+        self.files = {}
+        self.directories = {}
+        self.labels['files'] = {}
+        self.labels['directories'] = {}
+        for dirpan in self.dir_panels:
+            for child in self.dir_panels[dirpan].get_children():
+                self.dir_panels[dirpan].remove(child)
+
+        # Build the whole model first, rows are only created for what can be seen
+        for file in sorted(self.file_list(), key=lambda item: '/' in item):
+            self.add_file_model(file, rows=False)
+        if self.cur_directory not in self.filelist:
+            self.change_dir(None, self.root)
+        self.layout(self.cur_directory)
+        return False
+
+    def files_changed(self, newfiles, deletedfiles, updatedfiles=None):
+        if len(newfiles) > self.reload_threshold:
+            for file in deletedfiles:
+                self.delete_file(file)
+            self.reload()
+            return False
+        for file in newfiles:
+            self.add_file(file)
+        for file in deletedfiles:
+            self.delete_file(file)
+        if updatedfiles is not None:
+            for file in updatedfiles:
+                self.update_file(file)
+        return False
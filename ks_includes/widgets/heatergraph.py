@@ -1,7 +1,9 @@
 import datetime
 import logging
 import math
+from collections import deque
 
+import cairo
 import gi
 
 gi.require_version("Gtk", "3.0")
@@ -16,6 +18,8 @@ class HeaterGraph(Gtk.DrawingArea):
         self.get_style_context().add_class('heatergraph')
         self.printer = printer
         self.store = {}
+        self.envelopes = {}
+        self.static_layer = None
         self.max_length = 0
         self.connect('draw', self.draw_graph)
         self.add_events(Gdk.EventMask.TOUCH_MASK)
@@ -47,18 +51,56 @@ class HeaterGraph(Gtk.DrawingArea):
                    for name in self.store if "temperatures" in self.store[name]
                    and self.printer.get_temp_store(name, "temperatures"))
 
-    def get_max_num(self, data_points=0):
+    def get_max_num(self, envelopes):
         mnum = [0]
-        for device in self.store:
-            if self.store[device]['show']:
-                temp = self.printer.get_temp_store(device, "temperatures", data_points)
-                if temp:
-                    mnum.append(max(temp))
-                target = self.printer.get_temp_store(device, "targets", data_points)
-                if target:
-                    mnum.append(max(target))
+        for (device, dev_type), env in envelopes.items():
+            if dev_type in ("temperatures", "targets") and env["peak"] is not None:
+                mnum.append(env["peak"])
         return max(mnum)
 
+    def get_envelope(self, name, dev_type, step):
+        """Reduces a series to min/max pairs of step samples each.
+
+        Buckets are anchored to the absolute sample count, so completed buckets never change
+        and only the ones added since the last draw are computed.
+        """
+        data = self.printer.get_temp_store(name, dev_type, self.max_length)
+        if data is False:
+            return None
+        count = self.printer.get_temp_store_count(name, dev_type)
+        start = count - len(data)
+        first = -(-start // step)
+        last = count // step
+        env = self.envelopes.get((name, dev_type))
+        if env is None or env["step"] != step or env["next"] > last:
+            env = self.envelopes[(name, dev_type)] = {
+                "step": step, "next": first, "columns": deque(), "maxes": deque()
+            }
+        columns = env["columns"]
+        maxes = env["maxes"]
+        while columns and columns[0][0] < first:
+            columns.popleft()
+        while maxes and maxes[0][0] < first:
+            maxes.popleft()
+        for b in range(max(env["next"], first), last):
+            chunk = data[b * step - start:(b + 1) * step - start]
+            lo, hi = min(chunk), max(chunk)
+            columns.append((b, lo, hi))
+            # Monotonic queue, the first item is always the maximum of the window
+            while maxes and maxes[-1][1] <= hi:
+                maxes.pop()
+            maxes.append((b, hi))
+        env["next"] = max(env["next"], last)
+        env["start"] = start
+        env["count"] = count
+        tail = data[max(last * step - start, 0):]
+        env["tail"] = (min(tail), max(tail)) if len(tail) else None
+        peaks = [maxes[0][1]] if maxes else []
+        if env["tail"] is not None:
+            peaks.append(env["tail"][1])
+        env["peak"] = max(peaks) if peaks else None
+        return env
+
     def draw_graph(self, da, ctx):
         width = da.get_allocated_width()
         height = da.get_allocated_height()
@@ -68,20 +110,9 @@ class HeaterGraph(Gtk.DrawingArea):
         g_height_start = 10
         g_height = height - self.font_size * 2
 
-        ctx.set_source_rgb(.5, .5, .5)
         ctx.set_line_width(1)
         ctx.set_tolerance(0.1)
 
-        ctx.move_to(g_width_start, g_height_start)
-        ctx.line_to(g_width, g_height_start)
-        ctx.line_to(g_width, g_height)
-        ctx.line_to(g_width_start, g_height)
-        ctx.line_to(g_width_start, g_height_start)
-        ctx.stroke()
-
-        ctx.set_source_rgb(1, 0, 0)
-        ctx.move_to(g_width_start, height)
-
         gsize = [
             [g_width_start, g_height_start],
             [g_width, g_height]
@@ -90,44 +121,59 @@ class HeaterGraph(Gtk.DrawingArea):
         self.max_length = self.get_max_length()
         graph_width = gsize[1][0] - gsize[0][0]
         points_per_pixel = self.max_length / graph_width
-        data_points = int(round(graph_width * points_per_pixel, 0))
-        max_num = math.ceil(self.get_max_num(data_points) * 1.1 / 10) * 10
-        if points_per_pixel == 0:
+        envelopes = {}
+        if points_per_pixel > 0:
+            step = max(1, math.ceil(points_per_pixel))
+            for name in self.store:
+                if not self.store[name]['show']:
+                    continue
+                for dev_type in self.store[name]:
+                    env = self.get_envelope(name, dev_type, step)
+                    if env is not None:
+                        envelopes[(name, dev_type)] = env
+        max_num = math.ceil(self.get_max_num(envelopes) * 1.1 / 10) * 10
+
+        d_height_scale = self.graph_static(ctx, width, height, da.get_scale_factor(), gsize, max_num)
+        if points_per_pixel <= 0:
             return
         d_width = 1 / points_per_pixel
-
-        d_height_scale = self.graph_lines(ctx, gsize, max_num)
         self.graph_time(ctx, gsize, points_per_pixel)
 
-        for name in self.store:
-            if not self.store[name]['show']:
-                continue
-            for dev_type in self.store[name]:
-                d = self.printer.get_temp_store(name, dev_type, data_points)
-                if d is False:
-                    continue
-                self.graph_data(ctx, d, gsize, d_height_scale, d_width, self.store[name][dev_type]["rgb"],
-                                self.store[name][dev_type]["dashed"], self.store[name][dev_type]["fill"])
+        for (name, dev_type), env in envelopes.items():
+            self.graph_data(ctx, self.envelope_points(env, gsize, d_width), gsize, d_height_scale,
+                            self.store[name][dev_type]["rgb"],
+                            self.store[name][dev_type]["dashed"], self.store[name][dev_type]["fill"])
 
     @staticmethod
-    def graph_data(ctx, data, gsize, hscale, swidth, rgb, dashed=False, fill=False):
-        i = 0
+    def envelope_points(env, gsize, swidth):
+        step = env["step"]
+        offset = (step - 1) / 2 - env["start"]
+        points = [(gsize[0][0] + (b * step + offset) * swidth, lo, hi) for b, lo, hi in env["columns"]]
+        if env["tail"] is not None:
+            b = env["count"] // step
+            points.append((gsize[0][0] + (b * step - env["start"]) * swidth, *env["tail"]))
+        return points
+
+    @staticmethod
+    def graph_data(ctx, data, gsize, hscale, rgb, dashed=False, fill=False):
+        if not data:
+            return
         ctx.set_source_rgba(rgb[0], rgb[1], rgb[2], 1)
-        ctx.move_to(gsize[0][0] + 1, gsize[0][1] - 1)
         if dashed:
             ctx.set_dash([10, 5])
         else:
             ctx.set_dash([1, 0])
         d_len = len(data) - 1
-        for d in data:
-            p_x = i * swidth + gsize[0][0] if i != d_len else gsize[1][0] - 1
-            p_y = max(gsize[0][1], min(gsize[1][1], gsize[1][1] - 1 - (d * hscale)))
+        for i, (p_x, lo, hi) in enumerate(data):
+            p_x = max(gsize[0][0] + 1, min(gsize[1][0] - 1, p_x)) if i != d_len else gsize[1][0] - 1
+            p_lo = max(gsize[0][1], min(gsize[1][1], gsize[1][1] - 1 - (lo * hscale)))
+            p_hi = max(gsize[0][1], min(gsize[1][1], gsize[1][1] - 1 - (hi * hscale)))
             if i == 0:
-                ctx.move_to(gsize[0][0] + 1, p_y)
-                i += 1
-                continue
-            ctx.line_to(p_x, p_y)
-            i += 1
+                ctx.move_to(gsize[0][0] + 1, p_lo)
+            else:
+                ctx.line_to(p_x, p_lo)
+            if p_hi != p_lo:
+                ctx.line_to(p_x, p_hi)
         if fill is False:
             ctx.stroke()
             return
@@ -139,6 +185,32 @@ class HeaterGraph(Gtk.DrawingArea):
             ctx.set_source_rgba(rgb[0], rgb[1], rgb[2], .1)
             ctx.fill()
 
+    def graph_static(self, ctx, width, height, scale, gsize, max_num):
+        """Paints the border, grid and Y labels, rendered off-screen once per size and scale."""
+        key = (width, height, scale, max_num, self.font_size)
+        if self.static_layer is None or self.static_layer["key"] != key:
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width * scale, height * scale)
+            surface.set_device_scale(scale, scale)
+            sctx = cairo.Context(surface)
+            sctx.set_line_width(1)
+            sctx.set_tolerance(0.1)
+            self.graph_border(sctx, gsize)
+            hscale = self.graph_lines(sctx, gsize, max_num)
+            self.static_layer = {"key": key, "surface": surface, "hscale": hscale}
+        ctx.set_source_surface(self.static_layer["surface"], 0, 0)
+        ctx.paint()
+        return self.static_layer["hscale"]
+
+    @staticmethod
+    def graph_border(ctx, gsize):
+        ctx.set_source_rgb(.5, .5, .5)
+        ctx.move_to(gsize[0][0], gsize[0][1])
+        ctx.line_to(gsize[1][0], gsize[0][1])
+        ctx.line_to(gsize[1][0], gsize[1][1])
+        ctx.line_to(gsize[0][0], gsize[1][1])
+        ctx.line_to(gsize[0][0], gsize[0][1])
+        ctx.stroke()
+
     def graph_lines(self, ctx, gsize, max_num):
         nscale = 10
         max_num = min(max_num, 999)
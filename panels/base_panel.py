@@ -120,6 +120,7 @@ class BasePanel(ScreenPanel):
                 self.control['temp_box'].remove(child)
             devices = self._printer.get_temp_devices()
             if not show or not devices:
+                self._printer.unsubscribe(self.update_temps)
                 return
 
             img_size = self._gtk.img_scale * self.bts
@@ -161,6 +162,7 @@ class BasePanel(ScreenPanel):
                         break
 
             self.control['temp_box'].show_all()
+            self._printer.subscribe(self.update_temps, [(device, "temperature") for device in devices])
         except Exception as e:
             logging.debug(f"Couldn't create heaters box: {e}")
 
@@ -259,21 +261,6 @@ class BasePanel(ScreenPanel):
 
         if action != "notify_status_update" or self._screen.printer is None:
             return
-        devices = (self._printer.get_temp_devices())
-        if devices is not None:
-            for device in devices:
-                temp = self._printer.get_dev_stat(device, "temperature")
-                if temp is not None and device in self.labels:
-                    name = ""
-                    if not (device.startswith("extruder") or device.startswith("heater_bed")):
-                        if self.titlebar_name_type == "full":
-                            name = device.split()[1] if len(device.split()) > 1 else device
-                            name = f'{self.prettify(name)}: '
-                        elif self.titlebar_name_type == "short":
-                            name = device.split()[1] if len(device.split()) > 1 else device
-                            name = f"{name[:1].upper()}: "
-                    self.labels[device].set_label(f"{name}{int(temp)}°")
-
         with suppress(Exception):
             if data["toolhead"]["extruder"] != self.current_extruder:
                 self.control['temp_box'].remove(self.labels[f"{self.current_extruder}_box"])
@@ -284,6 +271,21 @@ class BasePanel(ScreenPanel):
 
         return False
 
+    def update_temps(self, changed):
+        for device, field in changed:
+            temp = self._printer.get_dev_stat(device, "temperature")
+            if temp is None or device not in self.labels:
+                continue
+            name = ""
+            if not (device.startswith("extruder") or device.startswith("heater_bed")):
+                if self.titlebar_name_type == "full":
+                    name = device.split()[1] if len(device.split()) > 1 else device
+                    name = f'{self.prettify(name)}: '
+                elif self.titlebar_name_type == "short":
+                    name = device.split()[1] if len(device.split()) > 1 else device
+                    name = f"{name[:1].upper()}: "
+            self._gtk.set_label(self.labels[device], f"{name}{int(temp)}°")
+
     def remove(self, widget):
         self.content.remove(widget)
 
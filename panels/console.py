@@ -122,7 +122,7 @@ class Panel(ScreenPanel):
             self.labels['tb'].delete(self.labels['tb'].get_iter_at_line(0), self.labels['tb'].get_iter_at_line(1))
 
     def gcode_response(self, result, method, params):
-        if method != "server.gcode_store":
+        if method != "server.gcode_store" or "result" not in result:
             return
 
         for resp in result['result']['gcode_store']:
@@ -133,14 +133,14 @@ class Panel(ScreenPanel):
             return
         if "gcode_move" in data:
             if "homing_origin" in data["gcode_move"]:
-                self.labels['zoffset'].set_label(f'  {data["gcode_move"]["homing_origin"][2]:.3f}mm')
+                self._gtk.set_label(self.labels['zoffset'], f'  {data["gcode_move"]["homing_origin"][2]:.3f}mm')
                 self.z_offset = float(data["gcode_move"]["homing_origin"][2])
             if "extrude_factor" in data["gcode_move"]:
                 self.extrusion = round(float(data["gcode_move"]["extrude_factor"]) * 100)
-                self.labels['extrudefactor'].set_label(f"  {self.extrusion:3}%")
+                self._gtk.set_label(self.labels['extrudefactor'], f"  {self.extrusion:3}%")
             if "speed_factor" in data["gcode_move"]:
                 self.speed = round(float(data["gcode_move"]["speed_factor"]) * 100)
-                self.labels['speedfactor'].set_label(f"  {self.speed:3}%")
+                self._gtk.set_label(self.labels['speedfactor'], f"  {self.speed:3}%")
 
         self.current_extruder = self._printer.get_stat("toolhead", "extruder")
         for x in self._printer.get_temp_devices():
@@ -32,7 +32,8 @@ class Panel(ScreenPanel):
         self.filename_label = self.filename = self.prev_pos = self.prev_gpos = None
         self.can_close = False
         self.flow_timeout = self.animation_timeout = None
-        self.file_metadata = self.fans = {}
+        self.file_metadata = {}
+        self.fans = {}
         self.state = "standby"
         self.timeleft_type = "auto"
         self.progress = self.zoffset = self.flowrate = self.vel = 0.0
@@ -362,11 +363,13 @@ class Panel(ScreenPanel):
     def activate(self):
         if self.flow_timeout is None:
             self.flow_timeout = GLib.timeout_add_seconds(2, self.update_flow)
+        self._printer.subscribe(self.update_fans, [(fan, "speed") for fan in self.fans])
 
     def deactivate(self):
         if self.flow_timeout is not None:
             GLib.source_remove(self.flow_timeout)
             self.flow_timeout = None
+        self._printer.unsubscribe(self.update_fans)
 
     def create_buttons(self):
 
@@ -606,9 +609,9 @@ class Panel(ScreenPanel):
                     self._printer.get_dev_stat(x, "power"),
                 )
                 if x in self.buttons['extruder']:
-                    self.buttons['extruder'][x].set_label(self.labels[x].get_text())
+                    self._gtk.set_label(self.buttons['extruder'][x], self.labels[x].get_text())
                 elif x in self.buttons['heater']:
-                    self.buttons['heater'][x].set_label(self.labels[x].get_text())
+                    self._gtk.set_label(self.buttons['heater'][x], self.labels[x].get_text())
 
                 if x == self.current_extruder:
                     self.extruder_target = self._printer.get_dev_stat(x, "target")
@@ -616,7 +619,8 @@ class Panel(ScreenPanel):
                     self.bed_target = self._printer.get_dev_stat(x, "target")
 
         if "display_status" in data and "message" in data["display_status"]:
-            self.labels['lcdmessage'].set_label(
+            self._gtk.set_label(
+                self.labels['lcdmessage'],
                 f"{data['display_status']['message'] if data['display_status']['message'] is not None else ''}"
             )
 
@@ -628,21 +632,22 @@ class Panel(ScreenPanel):
                 self.labels['temp_grid'].attach(self.buttons['extruder'][self.current_extruder], 0, 0, 1, 1)
                 self._screen.show_all()
         with suppress(KeyError):
-            self.labels['max_accel'].set_label(f"{data['toolhead']['max_accel']:.0f} {self.mms2}")
+            self._gtk.set_label(self.labels['max_accel'], f"{data['toolhead']['max_accel']:.0f} {self.mms2}")
         with suppress(KeyError):
-            self.labels['advance'].set_label(f"{data['extruder']['pressure_advance']:.2f}")
+            self._gtk.set_label(self.labels['advance'], f"{data['extruder']['pressure_advance']:.2f}")
 
         if "gcode_move" in data:
             with suppress(KeyError):
                 self.pos_z = round(float(data['gcode_move']['gcode_position'][2]), 2)
-                self.buttons['z'].set_label(f"Z: {self.pos_z:6.2f}{f'/{self.oheight}' if self.oheight > 0 else ''}")
+                self._gtk.set_label(self.buttons['z'],
+                                    f"Z: {self.pos_z:6.2f}{f'/{self.oheight}' if self.oheight > 0 else ''}")
             with suppress(KeyError):
                 self.extrusion = round(float(data["gcode_move"]["extrude_factor"]) * 100)
-                self.labels['extrude_factor'].set_label(f"{self.extrusion:3}%")
+                self._gtk.set_label(self.labels['extrude_factor'], f"{self.extrusion:3}%")
             with suppress(KeyError):
                 self.speed = round(float(data["gcode_move"]["speed_factor"]) * 100)
                 self.speed_factor = float(data["gcode_move"]["speed_factor"])
-                self.labels['speed_factor'].set_label(f"{self.speed:3}%")
+                self._gtk.set_label(self.labels['speed_factor'], f"{self.speed:3}%")
             with suppress(KeyError):
                 eps = 1e-9
                 self.req_speed = 100
@@ -651,20 +656,21 @@ class Panel(ScreenPanel):
                 
                 if self.req_speed > 1000:
                     self.req_speed = 1000
-                self.labels['req_speed'].set_label(
+                self._gtk.set_label(
+                    self.labels['req_speed'],
                     f"{self.speed}% {self.vel:3.0f}/{self.req_speed:3.0f} "
                     f"{f'{self.mms}' if self.vel < 1000 and self.req_speed < 1000 and self._screen.width > 500 else ''}"
                 )
-                self.buttons['speed'].set_label(self.labels['req_speed'].get_label())
+                self._gtk.set_label(self.buttons['speed'], self.labels['req_speed'].get_label())
             with suppress(KeyError):
                 self.zoffset = float(data["gcode_move"]["homing_origin"][2])
-                self.labels['zoffset'].set_label(f"{self.zoffset:.3f} {self.mm}")
+                self._gtk.set_label(self.labels['zoffset'], f"{self.zoffset:.3f} {self.mm}")
 
         if "motion_report" in data:
             with suppress(KeyError):
-                self.labels['pos_x'].set_label(f"X: {data['motion_report']['live_position'][0]:6.2f}")
-                self.labels['pos_y'].set_label(f"Y: {data['motion_report']['live_position'][1]:6.2f}")
-                self.labels['pos_z'].set_label(f"Z: {data['motion_report']['live_position'][2]:6.2f}")
+                self._gtk.set_label(self.labels['pos_x'], f"X: {data['motion_report']['live_position'][0]:6.2f}")
+                self._gtk.set_label(self.labels['pos_y'], f"Y: {data['motion_report']['live_position'][1]:6.2f}")
+                self._gtk.set_label(self.labels['pos_z'], f"Z: {data['motion_report']['live_position'][2]:6.2f}")
                 pos = data["motion_report"]["live_position"]
                 now = time()
                 if self.prev_pos is not None:
@@ -675,19 +681,14 @@ class Panel(ScreenPanel):
                 self.prev_pos = [pos, now]
             with suppress(KeyError):
                 self.vel = float(data["motion_report"]["live_velocity"])
-                self.labels['req_speed'].set_label(
+                self._gtk.set_label(
+                    self.labels['req_speed'],
                     f"{self.speed}% {self.vel:3.0f}/{self.req_speed:3.0f} "
                     f"{f'{self.mms}' if self.vel < 1000 and self.req_speed < 1000 and self._screen.width > 500 else ''}"
                 )
-                self.buttons['speed'].set_label(self.labels['req_speed'].get_label())
+                self._gtk.set_label(self.buttons['speed'], self.labels['req_speed'].get_label())
             with suppress(KeyError):
                 self.flowstore.append(self.fila_section * float(data["motion_report"]["live_extruder_velocity"]))
-        fan_label = ""
-        for fan in self.fans:
-            self.fans[fan]['speed'] = f"{self._printer.get_fan_speed(fan) * 100:3.0f}%"
-            fan_label += f" {self.fans[fan]['name']}{self.fans[fan]['speed']}"
-        if fan_label:
-            self.buttons['fan'].set_label(fan_label[:12])
         if "print_stats" in data:
             with suppress(KeyError):
                 self.set_state(
@@ -698,21 +699,25 @@ class Panel(ScreenPanel):
                 self.update_filename(data['print_stats']["filename"])
             with suppress(KeyError):
                 if 'filament_used' in data["print_stats"]:
-                    self.labels['filament_used'].set_label(
+                    self._gtk.set_label(
+                        self.labels['filament_used'],
                         f"{float(data['print_stats']['filament_used']) / 1000:.1f} m"
                     )
             if 'info' in data["print_stats"]:
                 with suppress(KeyError):
                     if data["print_stats"]['info']['total_layer'] is not None:
-                        self.labels['total_layers'].set_label(f"{data['print_stats']['info']['total_layer']}")
+                        self._gtk.set_label(self.labels['total_layers'],
+                                            f"{data['print_stats']['info']['total_layer']}")
                 with suppress(KeyError):
                     if data["print_stats"]['info']['current_layer'] is not None:
-                        self.labels['layer'].set_label(
+                        self._gtk.set_label(
+                            self.labels['layer'],
                             f"{data['print_stats']['info']['current_layer']} / "
                             f"{self.labels['total_layers'].get_text()}"
                         )
             elif "layer_height" in self.file_metadata and "object_height" in self.file_metadata:
-                self.labels['layer'].set_label(
+                self._gtk.set_label(
+                    self.labels['layer'],
                     f"{1 + round((self.pos_z - self.f_layer_h) / self.layer_h)} / "
                     f"{self.labels['total_layers'].get_text()}"
                 )
@@ -745,13 +750,22 @@ class Panel(ScreenPanel):
                                 self._screen._ws.klippy.gcode_script(f"SET_GCODE_OFFSET Z={self._screen.manual_settings[self.current_extruder]['zoffset']} MOVE=1")
                             logging.info(f"Setting zoffset to {self._screen.manual_settings[self.current_extruder]['zoffset']}, {self.current_extruder}")
                         self.previous_extruder = self.current_extruder
+
+    def update_fans(self, changed):
+        fan_label = ""
+        for fan in self.fans:
+            self.fans[fan]['speed'] = f"{self._printer.get_fan_speed(fan) * 100:3.0f}%"
+            fan_label += f" {self.fans[fan]['name']}{self.fans[fan]['speed']}"
+        if fan_label:
+            self._gtk.set_label(self.buttons['fan'], fan_label[:12])
+
     def update_flow(self):
         if not self.flowstore:
             self.flowstore.append(0)
         self.flowrate = median(self.flowstore)
         self.flowstore = []
-        self.labels['flowrate'].set_label(f"{self.flowrate:.1f} {self.mms3}")
-        self.buttons['extrusion'].set_label(f"{self.extrusion:3}% {self.flowrate:5.1f} {self.mms3}")
+        self._gtk.set_label(self.labels['flowrate'], f"{self.flowrate:.1f} {self.mms3}")
+        self._gtk.set_label(self.buttons['extrusion'], f"{self.extrusion:3}% {self.flowrate:5.1f} {self.mms3}")
         return True
 
     def update_time_left(self):
@@ -761,9 +775,9 @@ class Panel(ScreenPanel):
             print_duration = total_duration
         fila_used = float(self._printer.get_stat('print_stats', 'filament_used'))
         progress = float(self._printer.get_stat("virtual_sdcard", "progress"))
-        self.labels["duration"].set_label(self.format_time(total_duration))
+        self._gtk.set_label(self.labels["duration"], self.format_time(total_duration))
         elapsed_label = f"{self.labels['elapsed'].get_text()}  {self.labels['duration'].get_text()}"
-        self.buttons['elapsed'].set_label(elapsed_label)
+        self._gtk.set_label(self.buttons['elapsed'], elapsed_label)
         estimated = 0
         slicer_time = filament_time = file_time = None
         timeleft_type = self._config.get_config()['main'].get('print_estimate_method', 'auto')
@@ -773,15 +787,15 @@ class Panel(ScreenPanel):
                 # speed_factor compensation based on empirical testing
                 spdcomp = sqrt(self.speed_factor)
                 slicer_time = ((self.file_metadata['estimated_time']) / spdcomp)
-        self.labels["slicer_time"].set_label(self.format_time(slicer_time))
+        self._gtk.set_label(self.labels["slicer_time"], self.format_time(slicer_time))
 
         with suppress(Exception):
             if self.file_metadata['filament_total'] > fila_used:
                 filament_time = (print_duration / (fila_used / self.file_metadata['filament_total']))
-        self.labels["filament_time"].set_label(self.format_time(filament_time))
+        self._gtk.set_label(self.labels["filament_time"], self.format_time(filament_time))
         with suppress(ZeroDivisionError):
             file_time = (print_duration / progress)
-        self.labels["file_time"].set_label(self.format_time(file_time))
+        self._gtk.set_label(self.labels["file_time"], self.format_time(file_time))
 
         if timeleft_type == "file":
             estimated = file_time
@@ -810,15 +824,15 @@ class Panel(ScreenPanel):
             estimated = file_time
             progress = min(max(print_duration / estimated, 0), 1)
 
-        self.labels["est_time"].set_label(self.format_time(estimated))
-        self.labels["time_left"].set_label(self.format_eta(estimated, print_duration))
+        self._gtk.set_label(self.labels["est_time"], self.format_time(estimated))
+        self._gtk.set_label(self.labels["time_left"], self.format_eta(estimated, print_duration))
         remaining_label = f"{self.labels['left'].get_text()}  {self.labels['time_left'].get_text()}"
-        self.buttons['left'].set_label(remaining_label)
+        self._gtk.set_label(self.buttons['left'], remaining_label)
         self.update_progress(progress)
 
     def update_progress(self, progress: float):
         self.progress = progress
-        self.labels['progress_text'].set_label(f"{trunc(progress * 100)}%")
+        self._gtk.set_label(self.labels['progress_text'], f"{trunc(progress * 100)}%")
         self.labels['darea'].queue_draw()
 
     def set_state(self, state, msg=""):
@@ -170,25 +170,25 @@ class Panel(ScreenPanel):
         homed_axes = self._printer.get_stat("toolhead", "homed_axes")
         if homed_axes == "xyz":
             if "gcode_move" in data and "gcode_position" in data["gcode_move"]:
-                self.labels['pos_x'].set_text(f"X: {data['gcode_move']['gcode_position'][0]:.2f}")
-                self.labels['pos_y'].set_text(f"Y: {data['gcode_move']['gcode_position'][1]:.2f}")
-                self.labels['pos_z'].set_text(f"Z: {data['gcode_move']['gcode_position'][2]:.2f}")
+                self._gtk.set_label(self.labels['pos_x'], f"X: {data['gcode_move']['gcode_position'][0]:.2f}")
+                self._gtk.set_label(self.labels['pos_y'], f"Y: {data['gcode_move']['gcode_position'][1]:.2f}")
+                self._gtk.set_label(self.labels['pos_z'], f"Z: {data['gcode_move']['gcode_position'][2]:.2f}")
         else:
             if "x" in homed_axes:
                 if "gcode_move" in data and "gcode_position" in data["gcode_move"]:
-                    self.labels['pos_x'].set_text(f"X: {data['gcode_move']['gcode_position'][0]:.2f}")
+                    self._gtk.set_label(self.labels['pos_x'], f"X: {data['gcode_move']['gcode_position'][0]:.2f}")
             else:
-                self.labels['pos_x'].set_text("X: ?")
+                self._gtk.set_label(self.labels['pos_x'], "X: ?")
             if "y" in homed_axes:
                 if "gcode_move" in data and "gcode_position" in data["gcode_move"]:
-                    self.labels['pos_y'].set_text(f"Y: {data['gcode_move']['gcode_position'][1]:.2f}")
+                    self._gtk.set_label(self.labels['pos_y'], f"Y: {data['gcode_move']['gcode_position'][1]:.2f}")
             else:
-                self.labels['pos_y'].set_text("Y: ?")
+                self._gtk.set_label(self.labels['pos_y'], "Y: ?")
             if "z" in homed_axes:
                 if "gcode_move" in data and "gcode_position" in data["gcode_move"]:
-                    self.labels['pos_z'].set_text(f"Z: {data['gcode_move']['gcode_position'][2]:.2f}")
+                    self._gtk.set_label(self.labels['pos_z'], f"Z: {data['gcode_move']['gcode_position'][2]:.2f}")
             else:
-                self.labels['pos_z'].set_text("Z: ?")
+                self._gtk.set_label(self.labels['pos_z'], "Z: ?")
 
     def change_distance(self, widget, distance):
         logging.info(f"### Distance {distance}")
@@ -207,6 +207,9 @@ class Panel(ScreenPanel):
             return pixbuf.scale_simple(new_width, new_height, GdkPixbuf.InterpType.BILINEAR)
         
         if has_thumb:
+            pixbuf = self._screen.thumbnails.get(filename, width, height)
+            if pixbuf is not None:
+                return pixbuf
             loc = self._files.get_thumbnail_location(filename)
             logging.info(f"Thumbnail location: {loc}")
             
@@ -7,12 +7,10 @@ gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, GLib, Pango
 from datetime import datetime
 from ks_includes.screen_panel import ScreenPanel
+from ks_includes.widgets.filebrowser import FileBrowser
 
 
 class Panel(ScreenPanel):
-    cur_directory = "gcodes"
-    dir_panels = {}
-    filelist = {'gcodes': {'directories': [], 'files': []}}
 
     def __init__(self, screen, title):
         super().__init__(screen, title)
@@ -26,11 +24,6 @@ class Panel(ScreenPanel):
             "date": _("Date")
         }
         self.sort_icon = ["arrow-up", "arrow-down"]
-        self.scroll = self._gtk.ScrolledWindow()
-        self.files = {}
-        self.directories = {}
-        self.labels['directories'] = {}
-        self.labels['files'] = {}
         self.source = ""
         self.time_24 = self._config.get_main_config().getboolean("24htime", True)
         self.space = '  ' if self._screen.width > 480 else '\n'
@@ -60,120 +53,40 @@ class Panel(ScreenPanel):
         pbox.add(self.labels['path'])
         self.labels['path_box'] = pbox
 
+        self.browser = FileBrowser(
+            screen, "gcodes", self._screen.files.get_file_list, self._screen.files.get_file_info,
+            self.get_file_info_str, self.confirm_print, row_actions=self.add_row_actions,
+            dir_modified=self.get_dir_modified, dir_changed=self.dir_changed, sort=self.sort_current
+        )
+
         self.main = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
         self.main.set_vexpand(True)
         self.main.pack_start(sbox, False, False, 0)
         self.main.pack_start(pbox, False, False, 0)
-        self.main.pack_start(self.scroll, True, True, 0)
-
-        self.dir_panels['gcodes'] = Gtk.Grid()
+        self.main.pack_start(self.browser, True, True, 0)
 
-        GLib.idle_add(self.reload_files)
+        GLib.idle_add(self.browser.reload)
 
-        self.scroll.add(self.dir_panels['gcodes'])
         self.content.add(self.main)
         self._screen.files.add_file_callback(self._callback)
         self.showing_rename = False
 
     def activate(self):
-        if self.cur_directory != "gcodes":
-            self.change_dir(None, "gcodes")
+        if self.browser.cur_directory != "gcodes":
+            self.browser.change_dir(None, "gcodes")
         self._refresh_files()
 
-    def add_directory(self, directory, show=True):
-        parent_dir = os.path.dirname(directory)
-        modified = 0
+    def get_dir_modified(self, directory):
         for x in self._files.directories:
             if x['dirname'] == os.path.split(directory)[-1]:
-                modified = x['modified']
-                break
-        if directory not in self.filelist:
-            self.filelist[directory] = {'directories': [], 'files': [], 'modified': modified}
-            self.filelist[parent_dir]['directories'].append(directory)
-
-        if directory not in self.labels['directories']:
-            self._create_row(directory)
-        reverse = self.sort_current[1] != 0
-        dirs = sorted(
-            self.filelist[parent_dir]['directories'],
-            reverse=reverse, key=lambda item: self.filelist[item]['modified']
-        ) if self.sort_current[0] == "date" else sorted(self.filelist[parent_dir]['directories'], reverse=reverse)
-
-        pos = dirs.index(directory)
-
-        self.dir_panels[parent_dir].insert_row(pos)
-        self.dir_panels[parent_dir].attach(self.directories[directory], 0, pos, 1, 1)
-        if show is True:
-            self.dir_panels[parent_dir].show_all()
-
-    def add_file(self, filepath, show=True):
-        fileinfo = self._screen.files.get_file_info(filepath)
-        if fileinfo is None:
-            return
-        filename = os.path.basename(filepath)
-        if filename.startswith("."):
-            return
-        directory = os.path.dirname(os.path.join("gcodes", filepath))
-        d = directory.split(os.sep)
-        for i in range(1, len(d)):
-            curdir = os.path.join(*d[:i])
-            newdir = os.path.join(*d[:i + 1])
-            if newdir not in self.filelist[curdir]['directories']:
-                if newdir.startswith("."):
-                    return
-                self.add_directory(newdir)
-
-        if filename not in self.filelist[directory]['files']:
-            for i in range(1, len(d)):
-                curdir = os.path.join(*d[:i + 1])
-                if self.time_24:
-                    time = f":<b>{self.space}" \
-                           f"{datetime.fromtimestamp(self.filelist[curdir]['modified']):%Y/%m/%d %H:%M}</b>"
-                else:
-                    time = f":<b>{self.space}" \
-                           f"{datetime.fromtimestamp(self.filelist[curdir]['modified']):%Y/%m/%d %I:%M %p}</b>"
-                info = _("Modified") + time
-                info += "\n" + _("Size") + f':<b>{self.space}{self.format_size(fileinfo["size"])}</b>'
-                self.labels['directories'][curdir]['info'].set_markup(info)
-            self.filelist[directory]['files'].append(filename)
-
-        if filepath not in self.files:
-            self._create_row(filepath, filename)
-        reverse = self.sort_current[1] != 0
-        files = sorted(
-            self.filelist[directory]['files'],
-            reverse=reverse,
-            key=lambda item: self._screen.files.get_file_info(f"{directory}/{item}"[7:])['modified']
-        ) if self.sort_current[0] == "date" else sorted(self.filelist[directory]['files'], reverse=reverse)
-
-        pos = files.index(filename)
-        pos += len(self.filelist[directory]['directories'])
-
-        self.dir_panels[directory].insert_row(pos)
-        self.dir_panels[directory].attach(self.files[filepath], 0, pos, 1, 1)
-        if show is True:
-            self.dir_panels[directory].show_all()
-        return False
+                return x['modified']
+        return 0
 
-    def _create_row(self, fullpath, filename=None):
-        name = Gtk.Label()
-        name.get_style_context().add_class("print-filename")
-        if filename:
-            name.set_markup(f'<big><b>{os.path.splitext(filename)[0].replace("_", " ")}</b></big>')
-        else:
-            name.set_markup(f"<big><b>{os.path.split(fullpath)[-1]}</b></big>")
-        name.set_hexpand(True)
-        name.set_halign(Gtk.Align.START)
-        name.set_line_wrap(True)
-        name.set_line_wrap_mode(Pango.WrapMode.CHAR)
-
-        info = Gtk.Label()
-        name.set_line_wrap(True)
-        info.set_line_wrap_mode(Pango.WrapMode.CHAR)
-        info.set_hexpand(True)
-        info.set_halign(Gtk.Align.START)
-        info.get_style_context().add_class("print-info")
+    def dir_changed(self, directory):
+        self.labels['path'].set_text(f"  {directory[7:]}")
+        self.content.show_all()
 
+    def add_row_actions(self, row, fullpath, filename):
         delete = self._gtk.Button("delete", style="color1", scale=self.bts)
         delete.set_hexpand(False)
         rename = self._gtk.Button("files", style="color2", scale=self.bts)
@@ -182,61 +95,21 @@ class Panel(ScreenPanel):
         if filename:
             action = self._gtk.Button("print", style="color3")
             action.connect("clicked", self.confirm_print, fullpath)
-            info.set_markup(self.get_file_info_str(fullpath))
-            icon = Gtk.Button()
-            icon.connect("clicked", self.confirm_print, fullpath)
             delete.connect("clicked", self.confirm_delete_file, f"gcodes/{fullpath}")
             rename.connect("clicked", self.show_rename, f"gcodes/{fullpath}")
-            GLib.idle_add(self.image_load, fullpath)
         else:
             action = self._gtk.Button("load", style="color3")
-            action.connect("clicked", self.change_dir, fullpath)
-            icon = self._gtk.Button("folder")
-            icon.connect("clicked", self.change_dir, fullpath)
+            action.connect("clicked", self.browser.change_dir, fullpath)
             delete.connect("clicked", self.confirm_delete_directory, fullpath)
             rename.connect("clicked", self.show_rename, fullpath)
-        icon.set_hexpand(False)
         action.set_hexpand(False)
         action.set_halign(Gtk.Align.END)
 
-        delete.connect("clicked", self.confirm_delete_file, f"gcodes/{fullpath}")
-
-        row = Gtk.Grid()
-        row.get_style_context().add_class("frame-item")
-        row.set_hexpand(True)
-        row.set_vexpand(False)
-        row.attach(icon, 0, 0, 1, 2)
-        row.attach(name, 1, 0, 3, 1)
-        row.attach(info, 1, 1, 1, 1)
         row.attach(rename, 2, 1, 1, 1)
         row.attach(delete, 3, 1, 1, 1)
-
         if not filename or (filename and os.path.splitext(filename)[1] in [".gcode", ".g", ".gco"]):
             row.attach(action, 4, 0, 1, 2)
 
-        if filename is not None:
-            self.files[fullpath] = row
-            self.labels['files'][fullpath] = {
-                "icon": icon,
-                "info": info,
-                "name": name
-            }
-        else:
-            self.directories[fullpath] = row
-            self.labels['directories'][fullpath] = {
-                "info": info,
-                "name": name
-            }
-            self.dir_panels[fullpath] = Gtk.Grid()
-
-    def image_load(self, filepath):
-        pixbuf = self.get_file_image(filepath, small=True)
-        if pixbuf is not None:
-            self.labels['files'][filepath]['icon'].set_image(Gtk.Image.new_from_pixbuf(pixbuf))
-        else:
-            self.labels['files'][filepath]['icon'].set_image(self._gtk.Image("file"))
-        return False
-
     def confirm_delete_file(self, widget, filepath):
         logging.debug(f"Sending delete_file {filepath}")
         params = {"path": f"{filepath}"}
@@ -261,23 +134,7 @@ class Panel(ScreenPanel):
         if self.showing_rename:
             self.hide_rename()
             return True
-        if os.path.dirname(self.cur_directory):
-            self.change_dir(None, os.path.dirname(self.cur_directory))
-            return True
-        return False
-
-    def change_dir(self, widget, directory):
-        if directory not in self.dir_panels:
-            return
-        logging.debug(f"Changing dir to {directory}")
-
-        for child in self.scroll.get_children():
-            self.scroll.remove(child)
-        self.cur_directory = directory
-        self.labels['path'].set_text(f"  {self.cur_directory[7:]}")
-
-        self.scroll.add(self.dir_panels[directory])
-        self.content.show_all()
+        return self.browser.back()
 
     def change_sort(self, widget, key):
         if self.sort_current[0] == key:
@@ -291,7 +148,7 @@ class Panel(ScreenPanel):
         self.labels[f'sort_{key}'].set_image(self._gtk.Image(self.sort_icon[self.sort_current[1]],
                                                              self._gtk.img_scale * self.bts))
         self.labels[f'sort_{key}'].show()
-        GLib.idle_add(self.reload_files)
+        GLib.idle_add(self.browser.set_sort, key, self.sort_current[1] != 0)
 
         self._config.set("main", "print_sort_dir", f'{key}_{"asc" if self.sort_current[1] == 0 else "desc"}')
         self._config.save_user_config_options()
@@ -355,39 +212,6 @@ class Panel(ScreenPanel):
         if (response_id != Gtk.ResponseType.CANCEL):
             self._screen._ws.klippy.print_start(filename)
             self._screen.state_printing()
-    def delete_file(self, filename):
-        directory = os.path.join("gcodes", os.path.dirname(filename)) if os.path.dirname(filename) else "gcodes"
-        if directory not in self.filelist or os.path.basename(filename).startswith("."):
-            return
-        try:
-            self.filelist[directory]["files"].pop(self.filelist[directory]["files"].index(os.path.basename(filename)))
-        except Exception as e:
-            logging.exception(e)
-        dir_parts = directory.split(os.sep)
-        i = len(dir_parts)
-        while i > 1:
-            cur_dir = os.path.join(*dir_parts[:i])
-            if len(self.filelist[cur_dir]['directories']) > 0 or len(self.filelist[cur_dir]['files']) > 0:
-                break
-            parent_dir = os.path.dirname(cur_dir)
-
-            if self.cur_directory == cur_dir:
-                self.change_dir(None, parent_dir)
-
-            del self.filelist[cur_dir]
-            self.filelist[parent_dir]['directories'].pop(self.filelist[parent_dir]['directories'].index(cur_dir))
-            self.dir_panels[parent_dir].remove(self.directories[cur_dir])
-            del self.directories[cur_dir]
-            del self.labels['directories'][cur_dir]
-            self.dir_panels[parent_dir].show_all()
-            i -= 1
-
-        try:
-            self.dir_panels[directory].remove(self.files[filename])
-        except Exception as e:
-            logging.exception(e)
-        self.dir_panels[directory].show_all()
-        self.files.pop(filename)
 
     def get_file_info_str(self, filename):
 
@@ -406,36 +230,8 @@ class Panel(ScreenPanel):
             info += _("Print Time") + f':{self.space}<b>{self.format_time(fileinfo["estimated_time"])}</b>'
         return info
 
-    def reload_files(self, widget=None):
-        self.filelist = {'gcodes': {'directories': [], 'files': []}}
-        for dirpan in self.dir_panels:
-            for child in self.dir_panels[dirpan].get_children():
-                self.dir_panels[dirpan].remove(child)
-
-        flist = sorted(self._screen.files.get_file_list(), key=lambda item: '/' in item)
-        for file in flist:
-            GLib.idle_add(self.add_file, file)
-        return False
-
-    def update_file(self, filename):
-        if filename not in self.labels['files']:
-            logging.debug(f"Cannot update file, file not in labels: {filename}")
-            return
-
-        self.labels['files'][filename]['info'].set_markup(self.get_file_info_str(filename))
-
-        # Update icon
-        GLib.idle_add(self.image_load, filename)
-
     def _callback(self, newfiles, deletedfiles, updatedfiles=None):
-        for file in newfiles:
-            self.add_file(file)
-        for file in deletedfiles:
-            self.delete_file(file)
-        if updatedfiles is not None:
-            for file in updatedfiles:
-                self.update_file(file)
-        return False
+        return self.browser.files_changed(newfiles, deletedfiles, updatedfiles)
 
     def _refresh_files(self, widget=None):
         self._files.refresh_files()
@@ -47,61 +47,11 @@ class Panel(ScreenPanel):
         self.labels['lang_menu'] = self._gtk.ScrolledWindow()
         self.labels['lang'] = Gtk.Grid()
         self.labels['lang_menu'].add(self.labels['lang'])
-        language_dict = {
-            'bg': 'Български',
-            'ps': 'Pashto',
-            'es': 'Español',
-            'en': 'English',
-            'et': 'Eesti',
-            'pt': 'Português',
-            'zh': '中文',
-            'ar': 'العربية',
-            'fr': 'Français',
-            'de': 'Deutsch',
-            'el': 'Ελληνικά',
-            'hi': 'हिन्दी',
-            'id': 'Bahasa Indonesia',
-            'fa': 'فارسی',
-            'ga': 'Gaeilge',
-            'gu': 'ગુજરાતી',
-            'it': 'Italiano',
-            'ja': '日本語',
-            'sw': 'Kiswahili',
-            'ms': 'Bahasa Melayu',
-            'nl': 'Nederlands',
-            'mi': 'Te Reo Māori',
-            'ur': 'پاکستان',
-            'fil': 'Filipino ',
-            'pl': 'Polski',
-            'pt_BR': 'Português (Brasil)',
-            'ru': 'Русский',
-            'zu': 'isiZulu',
-            'ko': '한국어',
-            'sl': 'Slovenščina',
-            'sv': 'Svenska',
-            'th': 'ไทย',
-            'tr': 'Türkçe',
-            'vi': 'Tiếng Việt',
-            'fi': 'Suomi',
-            'no': 'Norsk',
-            'cs': 'Čeština',
-            'da': 'Dansk',
-            'he': 'עברית',
-            'hu': 'Magyar',
-            'jp': '日本語',
-            'uk': 'Українська',
-            'zh_CN': '简体中文',
-            'zh_TW': '繁體中文',
-            'de_formal': 'Deutsch (Formal)',
-            'lt': 'lietuvių',
-        }        
-        for lang in self._config.lang_list:
-            if lang not in language_dict:
-                continue
+        for lang, name in self._config.get_languages().items():
             self.langs[lang] = {
                 "code": lang,
                 "type": "lang",
-                "name": language_dict[lang],
+                "name": name,
             }
             self.add_option("lang", self.langs, lang, self.langs[lang])
 
@@ -57,7 +57,7 @@ class Panel(ScreenPanel):
         self.content.add(self.main_box)
 
     def activate(self):
-        self._screen._ws.send_method("machine.update.status", callback=self.get_updates)
+        self._screen._ws.send_method("machine.update.status", callback=self.get_updates, timeout=60)
 
     def create_info_grid(self):
         infogrid = Gtk.Grid()
@@ -108,7 +108,7 @@ class Panel(ScreenPanel):
         self._gtk.Button_busy(widget, True)
         logging.info("Sending machine.update.refresh")
         self._screen._ws.send_method(
-            "machine.update.refresh", callback=self.get_updates
+            "machine.update.refresh", callback=self.get_updates, timeout=180
         )
 
     def get_updates(self, response, method, params):
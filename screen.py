@@ -1,5 +1,13 @@
 #!/usr/bin/python
 
+import sys
+from ks_includes.startup_profile import profiler
+
+if "--profile-startup" in sys.argv:
+    # Before anything else is imported, so the imports are part of the report
+    profiler.enable()
+    profiler.begin("imports")
+
 import argparse
 import json
 import logging
@@ -8,7 +16,6 @@ import subprocess
 import pathlib
 import traceback  # noqa
 import locale
-import sys
 import gi
 import configparser
 import threading
@@ -23,9 +30,13 @@ from datetime import datetime
 from ks_includes import functions
 from ks_includes.KlippyWebsocket import KlippyWebsocket
 from ks_includes.KlippyRest import KlippyRest
+from ks_includes import moonraker_async
 from ks_includes.files import KlippyFiles
 from ks_includes.KlippyGtk import KlippyGtk
+from ks_includes.thumbnails import ThumbnailLoader
+from ks_includes.gcode_metadata import GcodeMetadataReader
 from ks_includes.printer import Printer
+from ks_includes.taskgraph import TaskGraph, TaskAbort
 from ks_includes.widgets.keyboard import Keyboard
 from ks_includes.config import KlipperScreenConfig
 from panels.base_panel import BasePanel
@@ -107,6 +118,7 @@ class KlipperScreen(Gtk.Window):
         self.blanking_time = 600
         self.use_dpms = True
         self.apiclient = None
+        self.init_graph = None
         self.dialogs = []
         self.confirm = None
         self.panels_reinit = []
@@ -114,7 +126,10 @@ class KlipperScreen(Gtk.Window):
 
         configfile = os.path.normpath(os.path.expanduser(args.configfile))
 
-        self._config = KlipperScreenConfig(configfile, self)
+        with profiler.span("KlipperScreenConfig"):
+            self._config = KlipperScreenConfig(configfile, self)
+        if args.clear_cache:
+            self._config.clear_cache_dir()
         self.lang_ltr = set_text_direction(self._config.get_main_config().get("language", None))
         self.env = Environment(extensions=["jinja2.ext.i18n"], autoescape=True)
         self.env.install_gettext_translations(self._config.get_lang())
@@ -150,11 +165,17 @@ class KlipperScreen(Gtk.Window):
         self.theme = self._config.get_main_config().get('theme', "colorized")
            
         self.show_cursor = self._config.get_main_config().getboolean("show_cursor", fallback=False)
-        self.gtk = KlippyGtk(self)
-        self.init_style()
+        with profiler.span("KlippyGtk"):
+            self.gtk = KlippyGtk(self)
+        self.thumbnails = ThumbnailLoader(self)
+        # Shared by the panels reading local gcode files, the cache is loaded on first use
+        self.gcode_metadata = GcodeMetadataReader(self._config.get_cache_dir())
+        with profiler.span("init_style"):
+            self.init_style()
         self.set_icon_from_file(os.path.join(klipperscreendir, "styles", "icon.svg"))
 
-        self.base_panel = BasePanel(self, title="Base Panel")
+        with profiler.span("BasePanel"):
+            self.base_panel = BasePanel(self, title="Base Panel")
         self.add(self.base_panel.main_grid)
         self.show_all()
         if self.show_cursor:
@@ -245,27 +266,46 @@ class KlipperScreen(Gtk.Window):
                 break
 
         self.printer = self.printers[ind]["data"]
-        self.apiclient = KlippyRest(
-            self.printers[ind][name]["moonraker_host"],
-            self.printers[ind][name]["moonraker_port"],
-            self.printers[ind][name]["moonraker_api_key"],
-        )
+        if self.init_graph is not None:
+            self.init_graph.cancel()
+            self.init_graph = None
+            self.initializing = False
+        if self.apiclient is not None:
+            self.apiclient.close()
+        host = self.printers[ind][name]["moonraker_host"]
+        port = self.printers[ind][name]["moonraker_port"]
+        api_key = self.printers[ind][name]["moonraker_api_key"]
+        pool_size = self._config.get_main_config().getint("rest_pool_size", 4)
+        retries = self._config.get_main_config().getint("rest_retries", 2)
+        callbacks = {
+            "on_connect": self.init_printer,
+            "on_message": self._websocket_callback,
+            "on_close": self.websocket_disconnected
+        }
+        if self.use_async_transport():
+            transport = moonraker_async.AsyncTransport(pool_size)
+            self.apiclient = moonraker_async.AsyncKlippyRest(transport, host, port, api_key, retries)
+            self._ws = moonraker_async.AsyncKlippyWebsocket(transport, self, callbacks, host, port)
+        else:
+            self.apiclient = KlippyRest(host, port, api_key, pool_size, retries)
+            self._ws = KlippyWebsocket(self, callbacks, host, port)
 
         self.printer_initializing(_("Connecting to %s") % name, remove=True)
 
-        self._ws = KlippyWebsocket(self,
-                                   {
-                                       "on_connect": self.init_printer,
-                                       "on_message": self._websocket_callback,
-                                       "on_close": self.websocket_disconnected
-                                   },
-                                   self.printers[ind][name]["moonraker_host"],
-                                   self.printers[ind][name]["moonraker_port"],
-                                   )
-
         self.files = KlippyFiles(self)
         self._ws.initial_connect()
 
+    def use_async_transport(self):
+        transport = self._config.get_main_config().get("moonraker_transport", "threaded")
+        if transport not in ("threaded", "asyncio"):
+            logging.error(f"Unknown moonraker_transport: {transport}, using threaded")
+            return False
+        if transport == "asyncio" and not moonraker_async.available():
+            logging.error("moonraker_transport: asyncio requires aiohttp, using threaded")
+            return False
+        logging.info(f"Moonraker transport: {transport}")
+        return transport == "asyncio"
+
     def ws_subscribe(self):
         requested_updates = {
             "objects": {
@@ -311,7 +351,8 @@ class KlipperScreen(Gtk.Window):
         if not os.path.exists(panel_path):
             logging.error(f"Panel {panel} does not exist")
             raise FileNotFoundError(os.strerror(2), "\n" + panel_path)
-        return import_module(f"panels.{panel}")
+        with profiler.span(f"panel {panel}"):
+            return import_module(f"panels.{panel}")
 
     def show_panel(self, panel, title, remove_all=False, panel_name=None, **kwargs):
         if panel_name is None:
@@ -1012,11 +1053,47 @@ class KlipperScreen(Gtk.Window):
         if self.reinit_count > self.max_retries or 'printer_select' in self._cur_panels:
             self.initializing = False
             return False
-        state = self.apiclient.get_server_info()
+        # REST calls run on a worker pool, results are applied by the main steps in dependency order
+        api = self.apiclient
+        graph = TaskGraph("Printer init")
+        graph.add("server_info", lambda r: api.get_server_info())
+        graph.add("power_devices", lambda r: self.init_request(r, "power", "machine/device_power/devices"),
+                  ["server_info"])
+        graph.add("webcams", lambda r: self.init_request(r, "webcam", "server/webcams/list"), ["server_info"])
+        graph.add("server", self.init_server, ["server_info", "power_devices", "webcams"], main=True)
+        graph.add("printer_info", lambda r: self.init_request(r, None, "printer/info",
+                                                              "Unable to get printer info from moonraker"), ["server"])
+        graph.add("configfile", lambda r: self.init_request(r, None, "printer/objects/query?configfile",
+                                                            "Error getting printer configuration"), ["server"])
+        graph.add("gcode_help", lambda r: api.get_gcode_help(), ["server"])
+        graph.add("system_info", lambda r: api.send_request("machine/system_info"), ["server"])
+        graph.add("reinit", self.init_reinit, ["printer_info", "configfile", "gcode_help", "system_info"], main=True)
+        graph.add("subscribe", self.init_subscribe, ["reinit"], main=True)
+        graph.add("status", lambda r: self.init_request(r, None, "printer/objects/query?" + "&".join(r["subscribe"]),
+                                                        "Error getting printer object data with extra items"),
+                  ["subscribe"])
+        graph.add("tempstore", lambda r: api.send_request("server/temperature_store") if r["reinit"] else None,
+                  ["reinit"])
+        graph.add("server_config", lambda r: api.send_request("server/config") if r["reinit"] else None, ["reinit"])
+        graph.add("finish", self.init_finish, ["status", "tempstore", "server_config"], main=True)
+        self.init_graph = graph
+        graph.run(self.init_printer_done)
+        return False
+
+    def init_request(self, results, component, method, error=None):
+        if component is not None and (results["server_info"] is False
+                                      or component not in results["server_info"]["result"]["components"]):
+            return None
+        result = self.apiclient.send_request(method)
+        if result is False and error is not None:
+            raise TaskAbort(error)
+        return result
+
+    def init_server(self, results):
+        state = results["server_info"]
         if state is False:
             logging.info("Moonraker not connected")
-            self.initializing = False
-            return False
+            raise TaskAbort()
         self.connecting = not self._ws.connected
         self.connected_printer = self.connecting_to_printer
         self.base_panel.set_ks_printer_cfg(self.connected_printer)
@@ -1024,7 +1101,7 @@ class KlipperScreen(Gtk.Window):
         # Moonraker is ready, set a loop to init the printer
         self.reinit_count += 1
 
-        server_info = self.apiclient.get_server_info()["result"]
+        server_info = state["result"]
         logging.info(f"Moonraker info {server_info}")
         popup = ''
         level = 2
@@ -1044,38 +1121,33 @@ class KlipperScreen(Gtk.Window):
                 level = 3
         if popup:
             self.show_popup_message(popup, level)
-        if "power" in server_info["components"]:
-            powerdevs = self.apiclient.send_request("machine/device_power/devices")
-            if powerdevs is not False:
-                self.printer.configure_power_devices(powerdevs['result'])
-        if "webcam" in server_info["components"]:
-            cameras = self.apiclient.send_request("server/webcams/list")
-            if cameras is not False:
-                self.printer.configure_cameras(cameras['result']['webcams'])
+        if results["power_devices"]:
+            self.printer.configure_power_devices(results["power_devices"]['result'])
+        if results["webcams"]:
+            self.printer.configure_cameras(results["webcams"]['result']['webcams'])
         if "spoolman" in server_info["components"]:
             self.printer.enable_spoolman()
 
-        if state['result']['klippy_connected'] is False:
+        if server_info['klippy_connected'] is False:
             logging.info("Klipper not connected")
             msg = _("Moonraker: connected") + "\n\n"
-            msg += f"Klipper: {state['result']['klippy_state']}" + "\n\n"
+            msg += f"Klipper: {server_info['klippy_state']}" + "\n\n"
             if self.reinit_count <= self.max_retries:
                 msg += _("Retrying") + f' #{self.reinit_count}'
-            return self._init_printer(msg)
-        printer_info = self.apiclient.get_printer_info()
-        if printer_info is False:
-            return self._init_printer("Unable to get printer info from moonraker")
-        config = self.apiclient.send_request("printer/objects/query?configfile")
-        if config is False:
-            return self._init_printer("Error getting printer configuration")
+            raise TaskAbort(msg)
+
+    def init_reinit(self, results):
+        config = results["configfile"]
         logging.debug(config['result']['status'])
         # Reinitialize printer, in case the printer was shut down and anything has changed.
-        self.printer.reinit(printer_info['result'], config['result']['status'])
-        self.printer.available_commands = self.apiclient.get_gcode_help()['result']
-        info = self.apiclient.send_request("machine/system_info")
+        self.printer.reinit(results["printer_info"]['result'], config['result']['status'])
+        self.printer.available_commands = results["gcode_help"]['result']
+        info = results["system_info"]
         if info and 'system_info' in info:
             self.printer.system_info = info['system_info']
+        return len(self.printer.get_temp_devices()) > 0
 
+    def init_subscribe(self, results):
         self.ws_subscribe()
         extra_items = (self.printer.get_tools()
                        + self.printer.get_heaters()
@@ -1084,27 +1156,38 @@ class KlipperScreen(Gtk.Window):
                        + self.printer.get_output_pins()
                        + self.printer.get_leds()
                        )
+        return PRINTER_BASE_STATUS_OBJECTS + extra_items
 
-        data = self.apiclient.send_request("printer/objects/query?" + "&".join(PRINTER_BASE_STATUS_OBJECTS +
-                                                                               extra_items))
-        if data is False:
-            return self._init_printer("Error getting printer object data with extra items")
-        if len(self.printer.get_temp_devices()) > 0:
-            self.init_tempstore()
+    def init_finish(self, results):
+        if results["reinit"]:
+            self.apply_tempstore(results["tempstore"], results["server_config"])
 
         self.files.initialize()
         self.files.refresh_files()
 
         logging.info("Printer initialized")
+        self.apiclient.log_stats()
+        self._ws.log_stats()
         self.initialized = True
         self.reinit_count = 0
         self.initializing = False
-        self.printer.process_update(data['result']['status'])
+        self.printer.process_update(results["status"]['result']['status'])
         self.log_notification("Printer Initialized", 1)
-        return False
+
+    def init_printer_done(self, results, error):
+        self.init_graph = None
+        if error is None:
+            return
+        if error.message is None:
+            self.initializing = False
+            return
+        self._init_printer(error.message)
 
     def init_tempstore(self):
-        tempstore = self.apiclient.send_request("server/temperature_store")
+        return self.apply_tempstore(self.apiclient.send_request("server/temperature_store"),
+                                    self.apiclient.send_request("server/config"))
+
+    def apply_tempstore(self, tempstore, server_config):
         if tempstore and 'result' in tempstore and tempstore['result']:
             self.printer.init_temp_store(tempstore['result'])
             if hasattr(self.panels[self._cur_panels[-1]], "update_graph_visibility"):
@@ -1112,8 +1195,7 @@ class KlipperScreen(Gtk.Window):
         else:
             logging.error(f'Tempstore not ready: {tempstore} Retrying in 5 seconds')
             GLib.timeout_add_seconds(5, self.init_tempstore)
-            return
-        server_config = self.apiclient.send_request("server/config")
+            return False
         if server_config:
             try:
                 self.printer.tempstore_size = server_config["result"]["config"]["data_store"]["temperature_store_size"]
@@ -1266,6 +1348,7 @@ def set_timezone_async(timezone):
     thread.start()
 
 def main():
+    profiler.end("imports")
     minimum = (3, 7)
     if not sys.version_info >= minimum:
         logging.error(f"python {sys.version_info.major}.{sys.version_info.minor} "
@@ -1285,6 +1368,14 @@ def main():
         "-l", "--logfile", default=os.path.join(logdir, "KlipperScreen.log"), metavar='<logfile>',
         help="Location of KlipperScreen logfile output"
     )
+    parser.add_argument(
+        "--clear-cache", action="store_true",
+        help="Empty the cache: gcode metadata, thumbnails and icons"
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="Time the startup up to the first frame and write a report next to the logfile"
+    )
     args = parser.parse_args()
 
     functions.setup_logging(os.path.normpath(os.path.expanduser(args.logfile)))
@@ -1293,11 +1384,23 @@ def main():
         logging.critical("Failed to initialize Gtk")
         raise RuntimeError
     try:
-        win = KlipperScreen(args)
+        with profiler.span("KlipperScreen"):
+            win = KlipperScreen(args)
     except Exception as e:
         logging.exception(f"Failed to initialize window\n{e}\n\n{traceback.format_exc()}")
         raise RuntimeError from e
     win.connect("destroy", Gtk.main_quit)
+    if profiler.enabled:
+        logdir = os.path.dirname(os.path.normpath(os.path.expanduser(args.logfile)))
+
+        def first_frame(widget, cr):
+            widget.disconnect(handler)
+            profiler.end("first frame")
+            profiler.finish(logdir)
+            return False
+
+        profiler.begin("first frame")
+        handler = win.connect_after("draw", first_frame)
     win.show_all()
     Gtk.main()
 
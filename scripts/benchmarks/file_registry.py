@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Measures how long KlippyFiles takes to process server.files.list responses of synthetic libraries
+#
+#   python3 scripts/benchmarks/file_registry.py [files ...]
+# Defaults to 10000 and 50000 files. Every size is listed three times:
+# initial listing, an unchanged refresh and a refresh with 1% of the files replaced.
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from ks_includes.files import KlippyFiles  # noqa: E402
+
+
+class FakeApi:
+    def __init__(self):
+        self.requests = 0
+
+    def get_file_metadata(self, *args, **kwargs):
+        self.requests += 1
+
+
+def listing(count, seed=0):
+    rng = random.Random(seed)
+    dirs = [""] + [f"dir{d}" for d in range(count // 500)] + [f"dir{d}/sub{s}" for d in range(4) for s in range(8)]
+    items = []
+    for i in range(count):
+        directory = rng.choice(dirs)
+        path = f"{directory}/part_{i:06d}.gcode" if directory else f"part_{i:06d}.gcode"
+        items.append({"path": path, "modified": 1700000000 + i, "size": rng.randint(10000, 50000000)})
+    return items
+
+
+def run(count):
+    api = FakeApi()
+    screen = SimpleNamespace(_ws=SimpleNamespace(klippy=api))
+    files = KlippyFiles(screen)
+    first = listing(count)
+    changed = list(first)
+    for i in range(0, count, 100):
+        changed[i] = {"path": f"new_{i:06d}.gcode", "modified": 1800000000 + i, "size": 1000}
+
+    for name, items in (("initial", first), ("unchanged", first), ("1% changed", changed)):
+        start = time.perf_counter()
+        files._callback({"result": items}, "server.files.list", {})
+        elapsed = time.perf_counter() - start
+        print(f"{count:>7} files {name:>11}: {elapsed * 1000:9.1f} ms")
+    print(f"{len(files.get_file_list())} files in {len(files.dir_index)} directories, "
+          f"{api.requests} metadata requests")
+
+
+def main():
+    for count in [int(x) for x in sys.argv[1:]] or [10000, 50000]:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Measures the decode throughput of every json codec available to KlippyWebsocket
+#
+# Replay a capture (one websocket frame per line):
+#   python3 scripts/benchmarks/json_codec.py frames.jsonl
+# Capture notify_status_update frames from a printer for 60 seconds:
+#   python3 scripts/benchmarks/json_codec.py --capture ws://127.0.0.1:7125/websocket 60 frames.jsonl
+# Without arguments a synthetic stream is used.
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from ks_includes.json_codec import CODECS  # noqa: E402
+
+
+def capture(url, seconds, output):
+    import websocket
+
+    ws = websocket.create_connection(url)
+    ws.send(json.dumps({"jsonrpc": "2.0", "method": "printer.objects.list", "id": 1}))
+    objects = json.loads(ws.recv())["result"]["objects"]
+    ws.send(json.dumps({"jsonrpc": "2.0", "method": "printer.objects.subscribe",
+                        "params": {"objects": {obj: None for obj in objects}}, "id": 2}))
+    end = time.monotonic() + seconds
+    frames = 0
+    with open(output, "w") as f:
+        while time.monotonic() < end:
+            frame = ws.recv()
+            if '"notify_status_update"' in frame:
+                f.write(frame.replace("\n", "") + "\n")
+                frames += 1
+    ws.close()
+    print(f"Captured {frames} frames in {output}")
+
+
+def synthetic(count):
+    frames = []
+    for i in range(count):
+        status = {
+            "motion_report": {"live_position": [random.uniform(0, 300) for _ in range(4)],
+                              "live_velocity": random.uniform(0, 300),
+                              "live_extruder_velocity": random.uniform(-5, 5)},
+            "toolhead": {"estimated_print_time": i * 0.25, "print_time": i * 0.25},
+            "print_stats": {"print_duration": i * 0.25, "total_duration": i * 0.25,
+                            "filament_used": i * 1.5},
+            "virtual_sdcard": {"file_position": i * 1000, "progress": i / count},
+        }
+        for n in range(8):
+            status[f"extruder{n or ''}"] = {"temperature": random.uniform(20, 250), "power": random.random()}
+        status["heater_bed"] = {"temperature": random.uniform(20, 110), "power": random.random()}
+        frames.append(json.dumps({"jsonrpc": "2.0", "method": "notify_status_update", "params": [status, i * 0.25]}))
+    return frames
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--capture":
+        capture(sys.argv[2], float(sys.argv[3]), sys.argv[4])
+        return
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            frames = [line.strip() for line in f if line.strip()]
+    else:
+        frames = synthetic(5000)
+    size = sum(len(frame) for frame in frames)
+    print(f"{len(frames)} frames, {size / 1024:.0f} KiB")
+    for name, (loads, dumps) in CODECS.items():
+        best = None
+        for _ in range(5):
+            start = time.perf_counter()
+            for frame in frames:
+                loads(frame)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>7}: {len(frames) / best:10.0f} frames/s {size / best / 1048576:8.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Compares the list based temperature store against ks_includes.ringbuffer.RingBuffer
+# Usage: python3 scripts/benchmarks/tempstore.py [devices] [size] [ticks]
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from ks_includes.ringbuffer import RingBuffer  # noqa: E402
+
+SECTIONS = ("temperatures", "targets", "powers")
+
+
+def list_store(devices, size):
+    return {f"heater{d}": {s: [0] * size for s in SECTIONS} for d in range(devices)}
+
+
+def ring_store(devices, size):
+    return {f"heater{d}": {s: RingBuffer(size) for s in SECTIONS} for d in range(devices)}
+
+
+def list_tick(store):
+    for device in store:
+        for x in store[device]:
+            store[device][x].pop(0)
+            store[device][x].append(200.0)
+
+
+def ring_tick(store):
+    for device in store:
+        for x in store[device]:
+            store[device][x].append(200.0)
+
+
+def list_read(store, results):
+    for device in store:
+        max(store[device]["temperatures"][-results:])
+
+
+def ring_read(store, results):
+    for device in store:
+        max(store[device]["temperatures"].last(results))
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+    ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    print(f"{devices} devices, {len(SECTIONS)} series each, {size} samples, {ticks} ticks")
+    for name, create, tick, read in (("list", list_store, list_tick, list_read),
+                                     ("ring", ring_store, ring_tick, ring_read)):
+        store = create(devices, size)
+        t_tick = timeit.timeit(lambda: tick(store), number=ticks)
+        t_read = timeit.timeit(lambda: read(store, size // 2), number=ticks // 10)
+        print(f"{name:>5}: update {t_tick / ticks * 1e6:8.2f} us/tick   read {t_read / (ticks // 10) * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# Compares loading every translation at startup against the language index plus the active language only
+# Usage: python3 scripts/benchmarks/translations.py [language] [runs]
+import gettext
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from ks_includes.config import LANGUAGE_NAMES, klipperscreendir  # noqa: E402
+
+LANG_PATH = os.path.join(klipperscreendir, "ks_includes", "locales")
+
+
+def list_languages():
+    return {lng: LANGUAGE_NAMES.get(lng, lng) for lng in sorted(os.listdir(LANG_PATH))
+            if os.path.isdir(os.path.join(LANG_PATH, lng))}
+
+
+def load(lng):
+    return gettext.translation('KlipperScreen', localedir=LANG_PATH, languages=[lng], fallback=True)
+
+
+def eager(lang):
+    langs = {lng: load(lng) for lng in list_languages()}
+    return langs[lang]
+
+
+def lazy(lang):
+    list_languages()
+    return load(lang)
+
+
+def measure(func, lang, runs):
+    best = None
+    for _ in range(runs):
+        # gettext keeps parsed catalogs, start every run from scratch like a fresh process
+        gettext._translations.clear()
+        start = time.perf_counter()
+        func(lang)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    lang = sys.argv[1] if len(sys.argv) > 1 else "en"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"{len(list_languages())} languages, active: {lang}, best of {runs}")
+    results = {name: measure(func, lang, runs) for name, func in (("eager", eager), ("lazy", lazy))}
+    for name, ms in results.items():
+        print(f"{name:>6}: {ms:8.2f} ms")
+    print(f"saved {results['eager'] - results['lazy']:.2f} ms ({results['eager'] / results['lazy']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
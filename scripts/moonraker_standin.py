@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# Minimal stand-in for Moonraker, enough for KlipperScreen to connect and initialize without a printer
+# Serves the HTTP endpoints used at startup and JSON-RPC (single and batch) on /websocket,
+# temperatures drift towards their targets and are pushed as notify_status_update.
+# Requires aiohttp. Usage: python3 scripts/moonraker_standin.py [port] [files]
+# then point a [printer] section at moonraker_host: 127.0.0.1 and moonraker_port: <port>
+import asyncio
+import json
+import logging
+import sys
+import time
+
+from aiohttp import WSMsgType, web
+
+CONFIG = {
+    "extruder": {"min_temp": "0", "max_temp": "300"},
+    "heater_bed": {"min_temp": "0", "max_temp": "120"},
+    "fan": {},
+    "virtual_sdcard": {"path": "~/printer_data/gcodes"},
+    "pause_resume": {},
+    "printer": {"kinematics": "cartesian", "max_velocity": "300", "max_accel": "3000"},
+    "stepper_x": {"position_max": "300"},
+    "stepper_y": {"position_max": "300"},
+    "stepper_z": {"position_max": "300"},
+}
+
+
+class StandIn:
+    def __init__(self, files=100):
+        self.started = time.time()
+        self.clients = set()
+        self.status = {
+            "configfile": {"config": CONFIG, "settings": CONFIG},
+            "extruder": {"temperature": 25.0, "target": 0.0, "power": 0.0},
+            "heater_bed": {"temperature": 25.0, "target": 0.0, "power": 0.0},
+            "fan": {"speed": 0.0},
+            "toolhead": {"homed_axes": "", "position": [0, 0, 0, 0], "extruder": "extruder", "max_velocity": 300,
+                         "max_accel": 3000, "max_accel_to_decel": 1500, "square_corner_velocity": 5,
+                         "estimated_print_time": 0, "print_time": 0},
+            "gcode_move": {"extrude_factor": 1, "speed_factor": 1, "speed": 1500, "homing_origin": [0, 0, 0, 0],
+                           "gcode_position": [0, 0, 0, 0]},
+            "print_stats": {"state": "standby", "filename": "", "print_duration": 0, "total_duration": 0,
+                            "filament_used": 0, "message": "", "info": {}},
+            "virtual_sdcard": {"file_position": 0, "is_active": False, "progress": 0},
+            "webhooks": {"state": "ready", "state_message": "Printer is ready"},
+            "idle_timeout": {"state": "Idle"},
+            "pause_resume": {"is_paused": False},
+            "display_status": {"progress": 0, "message": None},
+        }
+        self.files = [{"path": f"standin_{i:04}.gcode", "modified": self.started - i, "size": 1000 + i,
+                       "permissions": "rw"} for i in range(files)]
+        self.methods = {
+            "server.info": self.server_info,
+            "server.connection.identify": lambda p: {"connection_id": id(p)},
+            "server.files.list": lambda p: self.files,
+            "server.files.metadata": self.metadata,
+            "server.files.get_directory": lambda p: {"dirs": [], "files": [], "disk_usage": {}},
+            "server.files.directory": lambda p: {"dirs": [], "files": self.files, "disk_usage": {}},
+            "printer.info": lambda p: self.printer_info(),
+            "printer.objects.list": lambda p: {"objects": list(self.status)},
+            "printer.objects.query": self.query,
+            "printer.objects.subscribe": self.query,
+            "printer.gcode.script": self.gcode_script,
+            "printer.emergency_stop": lambda p: "ok",
+        }
+
+    @staticmethod
+    def server_info(params=None):
+        return {"klippy_connected": True, "klippy_state": "ready", "components": [], "failed_components": [],
+                "registered_directories": ["gcodes", "config"], "warnings": [], "websocket_count": 1,
+                "moonraker_version": "stand-in", "missing_klippy_requirements": [], "api_version": [1, 5, 0]}
+
+    @staticmethod
+    def printer_info():
+        return {"state": "ready", "state_message": "Printer is ready", "hostname": "standin",
+                "software_version": "stand-in", "cpu_info": "", "klipper_path": "", "python_path": "",
+                "log_file": "", "config_file": ""}
+
+    def metadata(self, params):
+        file = next((f for f in self.files if f["path"] == params.get("filename")), None)
+        if file is None:
+            raise KeyError(params.get("filename"))
+        return {"filename": file["path"], "size": file["size"], "modified": file["modified"],
+                "slicer": "StandIn", "estimated_time": 3600, "filament_total": 1000, "thumbnails": []}
+
+    def query(self, params):
+        objects = params.get("objects", {})
+        return {"eventtime": time.monotonic(),
+                "status": {name: dict(self.status[name]) for name in objects if name in self.status}}
+
+    def query_string(self, query):
+        return {"eventtime": time.monotonic(),
+                "status": {name: dict(self.status[name]) for name in query if name in self.status}}
+
+    def gcode_script(self, params):
+        for line in params.get("script", "").splitlines():
+            words = line.upper().split()
+            if words and words[0] in ("M104", "M140", "SET_HEATER_TEMPERATURE"):
+                heater = "heater_bed" if words[0] == "M140" or "HEATER=HEATER_BED" in words else "extruder"
+                target = next((w.split("=")[-1].lstrip("ST") for w in words[1:] if w[0] in "ST"), "0")
+                self.status[heater]["target"] = float(target)
+            elif words and words[0] == "G28":
+                self.status["toolhead"]["homed_axes"] = "xyz"
+        return "ok"
+
+    def call(self, request):
+        if not isinstance(request, dict) or "method" not in request:
+            return {"jsonrpc": "2.0", "error": {"code": -32600, "message": "Invalid Request"}, "id": None}
+        method = self.methods.get(request["method"])
+        if method is None:
+            error = {"code": -32601, "message": f"Method not found: {request['method']}"}
+            return {"jsonrpc": "2.0", "error": error, "id": request.get("id")}
+        try:
+            return {"jsonrpc": "2.0", "result": method(request.get("params", {})), "id": request.get("id")}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "error": {"code": 400, "message": f"{e}"}, "id": request.get("id")}
+
+    async def websocket(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self.clients.add(ws)
+        logging.info(f"Websocket opened, {len(self.clients)} clients")
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                response = [self.call(r) for r in data] if isinstance(data, list) else self.call(data)
+                await ws.send_str(json.dumps(response))
+        finally:
+            self.clients.discard(ws)
+            logging.info(f"Websocket closed, {len(self.clients)} clients")
+        return ws
+
+    async def notify(self):
+        while True:
+            await asyncio.sleep(1)
+            update = {}
+            for heater in ("extruder", "heater_bed"):
+                state = self.status[heater]
+                state["temperature"] = round(state["temperature"] + (max(state["target"], 25) - state["temperature"])
+                                             * .2, 2)
+                state["power"] = 1.0 if state["target"] > state["temperature"] else 0.0
+                update[heater] = dict(state)
+            message = json.dumps({"jsonrpc": "2.0", "method": "notify_status_update",
+                                  "params": [update, time.monotonic()]})
+            for ws in list(self.clients):
+                await ws.send_str(message)
+
+    def rest(self, handler):
+        async def wrapper(request):
+            try:
+                return web.json_response({"result": handler(request)})
+            except KeyError as e:
+                return web.json_response({"error": {"code": 404, "message": f"Not found: {e}"}}, status=404)
+        return wrapper
+
+    def temperature_store(self, request):
+        return {heater: {"temperatures": [self.status[heater]["temperature"]] * 10, "targets": [0] * 10,
+                         "powers": [0] * 10} for heater in ("extruder", "heater_bed")}
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/websocket", self.websocket)
+        app.router.add_get("/server/info", self.rest(self.server_info))
+        app.router.add_get("/access/oneshot_token", self.rest(lambda r: "standin"))
+        app.router.add_get("/printer/info", self.rest(lambda r: self.printer_info()))
+        app.router.add_get("/printer/gcode/help", self.rest(lambda r: {"G28": "Home"}))
+        app.router.add_get("/printer/objects/query", self.rest(lambda r: self.query_string(r.query)))
+        app.router.add_get("/machine/system_info", self.rest(lambda r: {"system_info": {}}))
+        app.router.add_get("/server/temperature_store", self.rest(self.temperature_store))
+        app.router.add_get("/server/config", self.rest(
+            lambda r: {"config": {"data_store": {"temperature_store_size": 1200}}}))
+        app.on_startup.append(self.start_notify)
+        return app
+
+    async def start_notify(self, app):
+        app["notify"] = asyncio.ensure_future(self.notify())
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 7125
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    web.run_app(StandIn(files).app(), host="127.0.0.1", port=port)
+
+
+if __name__ == "__main__":
+    main()